@@ -2,14 +2,24 @@
 
 from gas_agent.schema import HMISGasRecord
 from gas_agent.loader import load_hmis_excel
-from gas_agent.graph_agent import fill_record_with_graph
+from gas_agent.graph_agent import fill_record_with_graph, fill_record_with_provenance
 from gas_agent.graph import build_search_graph
-from gas_agent.pipeline import run_pipeline
+from gas_agent.pipeline import run_pipeline, run_column_pipeline
+from gas_agent.batch import run_batch_pipeline
+from gas_agent.validation import validate_records
+from gas_agent.work_queue import init_queue, run_worker, merge_queue_to_excel
 
 __all__ = [
     "HMISGasRecord",
     "load_hmis_excel",
     "fill_record_with_graph",
+    "fill_record_with_provenance",
     "build_search_graph",
     "run_pipeline",
+    "run_column_pipeline",
+    "run_batch_pipeline",
+    "validate_records",
+    "init_queue",
+    "run_worker",
+    "merge_queue_to_excel",
 ]
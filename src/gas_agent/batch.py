@@ -0,0 +1,519 @@
+"""
+Offline batch mode: all searches first, then every extraction prompt as one bulk job.
+
+    run_batch_pipeline("docs/HMIS TABLE.xlsx", "docs/HMIS_filled.xlsx")
+
+1. Search: every tier (local_sds, suppliers, standards, regulatory, open_web) plus one
+   general search per row, run concurrently. Pages already seen in an earlier tier of
+   the same row are dropped.
+2. Write: one `build_extraction_prompt` request per (row, tier with results) and one
+   sharded estimation request per row, in OpenAI Batch API JSONL format.
+3. Submit the file, poll until the job finishes, download the output.
+4. Apply: tier answers in tier order through `should_update_field` (as in
+   `extract_fields_node`), then estimates for fields still empty (as in
+   `extract_general_node`).
+
+Interactive latency is traded for the Batch API's lower price and throughput. Unlike the
+graph, every tier is asked for every empty field and there is no model cascade.
+`LocalBatchClient` runs the same job against any chat model for tests and offline use.
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+from langchain_core.messages import SystemMessage, HumanMessage
+
+from gas_agent.schema import HMISGasRecord, CompactRecord, get_empty_field_names
+from gas_agent.config import TIER_ORDER, DEFAULT_CONFIG
+from gas_agent.prompts import EXTRACTION_PREFIX, build_extraction_prompt
+from gas_agent.content_store import content_hash
+from gas_agent.tokens import PROMPT_STATS
+from gas_agent.latency import call_with_deadline, make_tavily_search
+from gas_agent.nodes import tier_search_params, general_search_query
+from gas_agent.utils import (
+    normalize_search_results,
+    parse_json_response,
+    build_context_from_results,
+    build_general_context,
+    apply_tier_updates,
+    apply_general_updates,
+    shard_fields,
+)
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+MAX_BATCH_REQUESTS = 50_000  # OpenAI per-file request limit
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+# ----------------------------------------------------------------------
+# Local stand-in for the OpenAI Files + Batches API
+# ----------------------------------------------------------------------
+
+
+class _LocalFiles:
+    def __init__(self, client: "LocalBatchClient"):
+        self._client = client
+
+    def create(self, *, file, purpose: str = "batch"):
+        if hasattr(file, "read"):
+            data = file.read()
+        elif isinstance(file, bytes):
+            data = file
+        else:
+            data = Path(file).read_bytes()
+        file_id = f"file-local-{uuid.uuid4().hex[:12]}"
+        with self._client._lock:
+            self._client._files[file_id] = data if isinstance(data, bytes) else data.encode("utf-8")
+        return SimpleNamespace(id=file_id, purpose=purpose, bytes=len(data))
+
+    def content(self, file_id: str):
+        with self._client._lock:
+            data = self._client._files[file_id]
+        return SimpleNamespace(text=data.decode("utf-8"), content=data)
+
+
+class _LocalBatches:
+    def __init__(self, client: "LocalBatchClient"):
+        self._client = client
+
+    def create(self, *, input_file_id: str, endpoint: str = BATCH_ENDPOINT, completion_window: str = "24h", **kwargs):
+        batch_id = f"batch-local-{uuid.uuid4().hex[:12]}"
+        batch = SimpleNamespace(
+            id=batch_id,
+            status="validating",
+            input_file_id=input_file_id,
+            output_file_id=None,
+            error_file_id=None,
+            request_counts=SimpleNamespace(total=0, completed=0, failed=0),
+        )
+        with self._client._lock:
+            self._client._batches[batch_id] = batch
+        threading.Thread(target=self._client._run, args=(batch,), daemon=True).start()
+        return batch
+
+    def retrieve(self, batch_id: str):
+        with self._client._lock:
+            return self._client._batches[batch_id]
+
+
+class LocalBatchClient:
+    """
+    In-process stand-in for `openai.OpenAI()` batch jobs: `files.create/content` and
+    `batches.create/retrieve`. Each request line is answered by `llm.invoke` in a
+    background thread pool, and output/error files use the Batch API line format.
+    """
+
+    def __init__(self, llm, *, max_workers: int = 8):
+        self.llm = llm
+        self.max_workers = max_workers
+        self.files = _LocalFiles(self)
+        self.batches = _LocalBatches(self)
+        self._files: dict[str, bytes] = {}
+        self._batches: dict[str, SimpleNamespace] = {}
+        self._lock = threading.Lock()
+
+    def _answer(self, line: dict) -> tuple[dict | None, dict | None]:
+        """One request line → (output line, error line)."""
+        body = line.get("body", {})
+        messages = [
+            SystemMessage(content=m["content"]) if m.get("role") == "system" else HumanMessage(content=m["content"])
+            for m in body.get("messages", [])
+        ]
+        try:
+            response = self.llm.invoke(messages)
+        except Exception as e:
+            error = {"code": "local_error", "message": repr(e)}
+            return None, {"id": f"req-{uuid.uuid4().hex[:12]}", "custom_id": line.get("custom_id"), "response": None, "error": error}
+        usage = getattr(response, "usage_metadata", None) or {}
+        return {
+            "id": f"req-{uuid.uuid4().hex[:12]}",
+            "custom_id": line.get("custom_id"),
+            "response": {
+                "status_code": 200,
+                "body": {
+                    "model": body.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": response.content or ""}}],
+                    "usage": {
+                        "prompt_tokens": usage.get("input_tokens", 0),
+                        "completion_tokens": usage.get("output_tokens", 0),
+                    },
+                },
+            },
+            "error": None,
+        }, None
+
+    def _store(self, lines: list[dict]) -> str | None:
+        if not lines:
+            return None
+        return self.files.create(file=("\n".join(json.dumps(l) for l in lines) + "\n").encode("utf-8")).id
+
+    def _run(self, batch: SimpleNamespace) -> None:
+        try:
+            text = self.files.content(batch.input_file_id).text
+            lines = [json.loads(l) for l in text.splitlines() if l.strip()]
+        except Exception as e:
+            logger.warning(f"✗ Local batch {batch.id} input invalid: {e}")
+            batch.status = "failed"
+            return
+
+        batch.request_counts.total = len(lines)
+        batch.status = "in_progress"
+        outputs, errors = [], []
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                for output, error in pool.map(self._answer, lines):
+                    if output is not None:
+                        outputs.append(output)
+                        batch.request_counts.completed += 1
+                    else:
+                        errors.append(error)
+                        batch.request_counts.failed += 1
+
+            batch.status = "finalizing"
+            batch.output_file_id = self._store(outputs)
+            batch.error_file_id = self._store(errors)
+            batch.status = "completed"
+        except Exception as e:
+            logger.warning(f"✗ Local batch {batch.id} failed: {e}")
+            batch.status = "failed"
+
+
+# ----------------------------------------------------------------------
+# Submission / polling
+# ----------------------------------------------------------------------
+
+
+def submit_batch(client, batch_path: str | Path) -> str:
+    """Upload a JSONL request file and create a batch job; returns the batch id."""
+    with open(batch_path, "rb") as f:
+        uploaded = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(input_file_id=uploaded.id, endpoint=BATCH_ENDPOINT, completion_window="24h")
+    logger.info(f"📤 Submitted {batch_path} as {batch.id}")
+    return batch.id
+
+
+def wait_for_batch(client, batch_id: str, *, poll_s: float = 30.0, timeout_s: float | None = None):
+    """Poll until the job reaches a terminal status; returns the final batch object."""
+    started = time.monotonic()
+    last_status = None
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        if batch.status != last_status:
+            counts = getattr(batch, "request_counts", None)
+            done = f" ({counts.completed}/{counts.total})" if counts is not None and counts.total else ""
+            logger.info(f"⏳ Batch {batch_id}: {batch.status}{done}")
+            last_status = batch.status
+        if batch.status in TERMINAL_STATUSES:
+            return batch
+        if timeout_s is not None and time.monotonic() - started > timeout_s:
+            raise TimeoutError(f"batch {batch_id} still {batch.status} after {timeout_s:.0f}s")
+        time.sleep(poll_s)
+
+
+def download_batch_output(client, batch) -> dict[str, str]:
+    """custom_id → assistant message content for every successful request."""
+    if batch.status != "completed":
+        logger.warning(f"⚠️  Batch {batch.id} ended as {batch.status}; applying partial output")
+    if getattr(batch, "error_file_id", None):
+        n_errors = sum(1 for l in client.files.content(batch.error_file_id).text.splitlines() if l.strip())
+        logger.warning(f"⚠️  Batch {batch.id}: {n_errors} failed requests")
+    if not getattr(batch, "output_file_id", None):
+        return {}
+
+    contents: dict[str, str] = {}
+    for raw in client.files.content(batch.output_file_id).text.splitlines():
+        if not raw.strip():
+            continue
+        line = json.loads(raw)
+        response = line.get("response") or {}
+        if line.get("error") or response.get("status_code") != 200:
+            continue
+        choices = (response.get("body") or {}).get("choices") or []
+        if choices:
+            contents[line["custom_id"]] = choices[0].get("message", {}).get("content") or ""
+    return contents
+
+
+# ----------------------------------------------------------------------
+# Batch fill
+# ----------------------------------------------------------------------
+
+
+def _search_row(record: HMISGasRecord, fields: list[str], *, search_tool, corpus, tiers: list[str], config: dict) -> dict:
+    """All searches for one row: {tier: results, "general": results}. Repeated pages are dropped."""
+    max_results = config["max_results_per_search"]
+    seen: set[str] = set()
+    found: dict[str, list] = {}
+
+    for tier in tiers + ["general"]:
+        if tier == "general":
+            tool, params, provider = search_tool, {"query": general_search_query(record, fields)}, "tavily"
+        elif tier == "local_sds":
+            tool, params, provider = corpus, tier_search_params(record, tier, max_results), "local_sds"
+        else:
+            tool, params, provider = search_tool, tier_search_params(record, tier, max_results), "tavily"
+        try:
+            results = call_with_deadline(
+                lambda tool=tool, params=params: tool.invoke(params),
+                provider=provider,
+                node="batch_search",
+                timeout_s=config.get("search_timeout_s"),
+            )
+            results = normalize_search_results(results).get("results", [])[:max_results]
+        except Exception as e:
+            logger.warning(f"✗ Search failed ({tier}): {e}")
+            results = []
+
+        if tier != "general":
+            fresh = []
+            for r in results:
+                if not isinstance(r, dict):
+                    continue
+                digest = content_hash(r.get("content", ""))
+                if digest not in seen:
+                    seen.add(digest)
+                    fresh.append(r)
+            results = fresh
+        found[tier] = results
+    return found
+
+
+def _request_line(custom_id: str, model: str, prompt: str) -> dict:
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {
+            "model": model,
+            "temperature": 0,
+            "messages": [
+                {"role": "system", "content": EXTRACTION_PREFIX},
+                {"role": "user", "content": prompt},
+            ],
+        },
+    }
+
+
+def fill_records_with_batch(
+    records: list[HMISGasRecord],
+    *,
+    pending_fields: dict[int, list[str]] | None = None,
+    client=None,
+    search_tool=None,
+    corpus=None,
+    model: str = DEFAULT_CONFIG["model"],
+    batch_path: str | Path = "extraction_batch.jsonl",
+    poll_s: float = 30.0,
+    timeout_s: float | None = None,
+    confidence_threshold: float = 0.6,
+    overwrite_delta: float = 0.2,
+    max_snippet_chars: int = 1500,
+    max_results_per_search: int = 5,
+    enable_open_web_fallback: bool = True,
+    search_timeout_s: float | None = DEFAULT_CONFIG["search_timeout_s"],
+    max_fields_per_shard: int = DEFAULT_CONFIG["max_fields_per_shard"],
+    max_search_workers: int = 8,
+    neighbors=None,
+    prior_provenance: dict[int, dict[str, dict]] | None = None,
+) -> tuple[list[HMISGasRecord], dict[int, dict[str, dict]]]:
+    """
+    Fill records through one batch job. Returns (records, provenance by row index).
+
+    `pending_fields` maps row index → fields to clear and re-fill (e.g. from
+    `validate_records`); only those rows are processed. Otherwise every row's empty
+    fields are filled. `client` defaults to `openai.OpenAI()`; pass a
+    `LocalBatchClient` to run without the Batch API. With `neighbors` (a
+    `NeighborIndex`), estimation prompts carry similar chemicals' verified values;
+    on a re-fill pass `prior_provenance` (from the first pass) tells the index which of
+    the row's other cells were filled by the agent.
+    """
+    config = {
+        "confidence_threshold": confidence_threshold,
+        "overwrite_delta": overwrite_delta,
+        "max_results_per_search": max_results_per_search,
+        "search_timeout_s": search_timeout_s,
+    }
+    if client is None:
+        from openai import OpenAI
+
+        client = OpenAI()
+    if search_tool is None:
+        search_tool = make_tavily_search(max_results_per_search, search_timeout_s)
+
+    tiers = [t for t in TIER_ORDER if t != "local_sds" or corpus is not None]
+    if not enable_open_web_fallback:
+        tiers = tiers[:-1]
+
+    # Rows and fields to fill
+    records = list(records)
+    targets: dict[int, list[str]] = {}
+    for idx, record in enumerate(records):
+        if pending_fields is not None:
+            if idx not in pending_fields:
+                continue
+            fields = list(pending_fields[idx])
+            records[idx] = HMISGasRecord(**{**record.model_dump(), **{f: None for f in fields}})
+        else:
+            fields = get_empty_field_names(record)
+        if fields:
+            targets[idx] = fields
+    if not targets:
+        return records, {}
+
+    # 1. Searches
+    logger.info(f"🔍 Batch search: {len(targets)} rows × {len(tiers) + 1} searches")
+    with ThreadPoolExecutor(max_workers=max_search_workers) as pool:
+        futures = {
+            idx: pool.submit(
+                _search_row, records[idx], fields,
+                search_tool=search_tool, corpus=corpus, tiers=tiers, config=config,
+            )
+            for idx, fields in targets.items()
+        }
+        searched = {idx: future.result() for idx, future in futures.items()}
+
+    # 2. Prompts
+    prompts: dict[str, str] = {}
+    for idx, fields in targets.items():
+        record = records[idx]
+        chemical = record.chemical_name or record.sub_system_filter_formula or "chemical"
+        for tier in tiers:
+            results = searched[idx][tier]
+            if not results:
+                continue
+            context = build_context_from_results(results, max_results_per_search, max_snippet_chars)
+            prompts[f"row-{idx}-{tier}"] = build_extraction_prompt(chemical, fields, context)
+        context = build_general_context(searched[idx]["general"])
+        for n, shard in enumerate(shard_fields(fields, max_fields_per_shard)):
+            examples = neighbors.few_shot_context(record, shard) if neighbors is not None else ""
+            prompts[f"row-{idx}-general-{n}"] = build_extraction_prompt(
+                chemical, shard, context, is_general=True, examples=examples
+            )
+    lines = [_request_line(custom_id, model, prompt) for custom_id, prompt in prompts.items()]
+
+    # 3. Submit + poll (split if over the per-file limit)
+    batch_path = Path(batch_path)
+    contents: dict[str, str] = {}
+    for start in range(0, len(lines), MAX_BATCH_REQUESTS):
+        chunk = lines[start:start + MAX_BATCH_REQUESTS]
+        path = batch_path if start == 0 else batch_path.with_name(f"{batch_path.stem}_{start // MAX_BATCH_REQUESTS}{batch_path.suffix}")
+        path.write_text("".join(json.dumps(l) + "\n" for l in chunk), encoding="utf-8")
+        logger.info(f"📝 {len(chunk)} extraction requests → {path}")
+        batch_id = submit_batch(client, path)
+        batch = wait_for_batch(client, batch_id, poll_s=poll_s, timeout_s=timeout_s)
+        contents.update(download_batch_output(client, batch))
+
+    for custom_id, content in contents.items():
+        if custom_id in prompts:
+            PROMPT_STATS.record(EXTRACTION_PREFIX, prompts[custom_id])
+
+    # 4. Apply: tiers in order, then estimates for what is still empty
+    provenance: dict[int, dict[str, dict]] = {}
+    for idx, fields in targets.items():
+        current = CompactRecord.from_record(records[idx], pending=fields)
+        filled: dict[str, dict] = {}
+        for tier in tiers:
+            data = parse_json_response(contents.get(f"row-{idx}-{tier}", "").strip())
+            if not data:
+                continue
+            new_record = current.copy()
+            apply_tier_updates(current, new_record, filled, data.get("updates", []), tier, config)
+            current = new_record
+
+        general_updates: list[dict] = []
+        for n in range(len(shard_fields(fields, max_fields_per_shard))):
+            data = parse_json_response(contents.get(f"row-{idx}-general-{n}", "").strip())
+            general_updates.extend(data.get("updates", []) if data else [])
+        new_record = current.copy()
+        apply_general_updates(current, new_record, filled, general_updates, has_results=bool(searched[idx]["general"]))
+        current = new_record
+
+        records[idx] = current.to_record()
+        provenance[idx] = filled
+        if neighbors is not None:
+            # The whole row's provenance, so earlier estimates are not taken as verified
+            prior = {f: p for f, p in (prior_provenance or {}).get(idx, {}).items() if f not in fields}
+            neighbors.add(records[idx], {**prior, **filled})
+
+    n_filled = sum(len(p) for p in provenance.values())
+    logger.info(f"✓ Batch complete: {len(contents)}/{len(lines)} responses, {n_filled} fields filled")
+    return records, provenance
+
+
+def run_batch_pipeline(
+    input_path: str | Path,
+    output_path: str | Path | None = None,
+    *,
+    sheet_name: str | None = None,
+    max_rows: int | None = None,
+    validate: bool = True,
+    sds_corpus_dir: str | Path | None = None,
+    client=None,
+    search_tool=None,
+    **batch_kwargs,
+) -> list[HMISGasRecord]:
+    """
+    `run_pipeline` counterpart for nightly refreshes: load → batch fill → validate →
+    batch re-fill of flagged cells → export. Extra kwargs go to `fill_records_with_batch`.
+    """
+    from gas_agent.loader import load_hmis_excel
+    from gas_agent.export import export_records_to_excel
+    from gas_agent.corpus import SDSCorpus
+    from gas_agent.validation import label_unparsed, normalize_units, validate_records
+    from gas_agent.neighbors import NeighborIndex
+
+    path = Path(input_path)
+    records = load_hmis_excel(path, sheet_name=sheet_name)
+    if max_rows is not None:
+        records = records[:max_rows]
+
+    corpus = None
+    if sds_corpus_dir is not None:
+        corpus_dir = Path(sds_corpus_dir)
+        corpus = SDSCorpus(corpus_dir, index_path=corpus_dir / ".sds_index.json")
+
+    if output_path is not None and "batch_path" not in batch_kwargs:
+        batch_kwargs["batch_path"] = Path(output_path).with_suffix(".batch.jsonl")
+
+    batch_kwargs.setdefault("neighbors", NeighborIndex.from_records(records))
+    filled, provenance = fill_records_with_batch(
+        records, client=client, search_tool=search_tool, corpus=corpus, **batch_kwargs
+    )
+
+    if validate:
+        filled = normalize_units(filled)
+        # Only cells the agent filled are labeled or re-filled; source values are left alone
+        filled_cells = {i: set(p) for i, p in provenance.items()}
+        filled = label_unparsed(filled, filled_cells)
+        issues = validate_records(filled, filled_cells=filled_cells)
+        if issues:
+            print(f"Re-filling flagged cells in {len(issues)} rows (batch)")
+            refill_kwargs = dict(batch_kwargs)
+            if "batch_path" in refill_kwargs:
+                p = Path(refill_kwargs["batch_path"])
+                refill_kwargs["batch_path"] = p.with_name(f"{p.stem}_refill{p.suffix}")
+            else:
+                refill_kwargs["batch_path"] = "extraction_batch_refill.jsonl"
+            filled, _ = fill_records_with_batch(
+                filled,
+                pending_fields={idx: list(fields) for idx, fields in issues.items()},
+                prior_provenance=provenance,
+                client=client,
+                search_tool=search_tool,
+                corpus=corpus,
+                **refill_kwargs,
+            )
+
+    print(f"Prompt tokens: {PROMPT_STATS.summary()}")
+
+    if output_path:
+        export_records_to_excel(filled, output_path, original_path=path)
+    return filled
@@ -0,0 +1,192 @@
+"""
+Run-level budget and deadline-aware scheduling for a table fill.
+
+`RunBudget` holds the global caps (Tavily calls, LLM tokens, wall-clock seconds) for a
+whole run. Rows are processed in expected-value order (most empty safety-critical fields
+first) and each row gets a `RowBudget` with a weighted share of what is left. Nodes ask
+the row budget before searching; once it is spent the graph degrades to a single
+estimation pass instead of more searches.
+"""
+
+import logging
+import threading
+import time
+
+from gas_agent.schema import HMISGasRecord, get_empty_field_names
+
+logger = logging.getLogger(__name__)
+
+
+# Fields whose absence matters most for safety review (weighted higher when scheduling)
+SAFETY_CRITICAL_FIELDS = {
+    "cas_number": 3.0,
+    "hazard_class": 3.0,
+    "flammability": 3.0,
+    "reactivity": 3.0,
+    "hazardous_statement": 3.0,
+    "ghs06_toxic": 2.5,
+    "ghs02_flammable": 2.5,
+    "ghs05_corrosive": 2.5,
+    "ghs03_oxidizing": 2.5,
+    "ghs01_explosive": 2.5,
+    "ghs04_compressed": 2.0,
+    "ghs08_harmful_health": 2.0,
+    "ghs07_harmful": 2.0,
+    "ghs09_environmental": 1.5,
+    "flash_point": 2.0,
+    "boiling_point_c": 1.5,
+    "vapor_pressure_bar": 1.5,
+    "physical_form": 1.5,
+    "gas_detection_gds": 1.5,
+    "exhausted_enclosure": 1.5,
+    "fire_extinguishing_media": 1.5,
+}
+
+DEFAULT_FIELD_WEIGHT = 1.0
+
+# Rough cost of one extraction call, reserved before each LLM call and settled with the
+# actual usage afterwards. A call that uses more than this can still overshoot the cap.
+EST_TOKENS_PER_LLM_CALL = 3000
+
+
+def field_weight(field: str) -> float:
+    """Expected value of filling one field."""
+    return SAFETY_CRITICAL_FIELDS.get(field, DEFAULT_FIELD_WEIGHT)
+
+
+def prioritize_fields(fields: list[str]) -> list[str]:
+    """Order fields by expected value (stable for equal weights)."""
+    return sorted(fields, key=field_weight, reverse=True)
+
+
+def row_weight(record: HMISGasRecord) -> float:
+    """Expected value of filling a row: weighted count of its empty fields."""
+    return sum(field_weight(f) for f in get_empty_field_names(record))
+
+
+def prioritize_records(records: list[HMISGasRecord]) -> list[int]:
+    """Return record indices, highest expected value first."""
+    weights = [row_weight(r) for r in records]
+    return sorted(range(len(records)), key=lambda i: weights[i], reverse=True)
+
+
+def response_tokens(response, prompt: str = "") -> int:
+    """Total tokens of an LLM response; falls back to ~4 chars/token if usage is missing."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage.get("total_tokens"):
+        return int(usage["total_tokens"])
+    content = getattr(response, "content", "") or ""
+    return (len(prompt) + len(content)) // 4
+
+
+class RunBudget:
+    """Global, thread-safe caps for one table run. `None` means unlimited."""
+
+    def __init__(
+        self,
+        *,
+        max_search_calls: int | None = None,
+        max_llm_tokens: int | None = None,
+        time_budget_s: float | None = None,
+    ):
+        self.max_search_calls = max_search_calls
+        self.max_llm_tokens = max_llm_tokens
+        self.time_budget_s = time_budget_s
+        self.started_at = time.monotonic()
+        self.search_calls = 0
+        self.llm_tokens = 0
+        self._lock = threading.Lock()
+
+    def remaining_searches(self) -> float:
+        if self.max_search_calls is None:
+            return float("inf")
+        return max(0, self.max_search_calls - self.search_calls)
+
+    def remaining_tokens(self) -> float:
+        if self.max_llm_tokens is None:
+            return float("inf")
+        return max(0, self.max_llm_tokens - self.llm_tokens)
+
+    def remaining_time(self) -> float:
+        if self.time_budget_s is None:
+            return float("inf")
+        return max(0.0, self.time_budget_s - (time.monotonic() - self.started_at))
+
+    def try_search(self) -> bool:
+        """Reserve one search call; False if the global cap or deadline is reached."""
+        with self._lock:
+            if self.remaining_searches() < 1 or self.remaining_time() <= 0:
+                return False
+            self.search_calls += 1
+            return True
+
+    def llm_available(self, estimated_tokens: int = EST_TOKENS_PER_LLM_CALL) -> bool:
+        return self.remaining_tokens() >= estimated_tokens
+
+    def reserve_llm(self, estimated_tokens: int = EST_TOKENS_PER_LLM_CALL) -> bool:
+        """Reserve tokens for one LLM call; False if the cap would be passed."""
+        with self._lock:
+            if self.remaining_tokens() < estimated_tokens:
+                return False
+            self.llm_tokens += estimated_tokens
+            return True
+
+    def record_llm(self, tokens: int, reserved: int = 0) -> None:
+        """Charge a call's actual tokens, replacing what was reserved for it."""
+        with self._lock:
+            self.llm_tokens += tokens - reserved
+
+    def for_row(self, weight: float, remaining_weight: float, remaining_rows: int) -> "RowBudget":
+        """
+        Carve out a row's share of what is left, proportional to its expected value.
+        Every row keeps at least one search so high-value rows are never starved to zero
+        while budget remains.
+        """
+        share = weight / remaining_weight if remaining_weight > 0 else 1.0 / max(remaining_rows, 1)
+        searches = self.remaining_searches()
+        max_searches = None if searches == float("inf") else max(1, round(searches * share))
+        seconds = self.remaining_time()
+        deadline = None if seconds == float("inf") else time.monotonic() + seconds * share
+        return RowBudget(self, max_searches=max_searches, deadline=deadline)
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self.started_at
+        return f"{self.search_calls} searches, {self.llm_tokens} LLM tokens, {elapsed:.0f}s"
+
+
+class RowBudget:
+    """One row's slice of a `RunBudget`; passed to the graph via state["budget"]."""
+
+    def __init__(self, run: RunBudget, *, max_searches: int | None, deadline: float | None):
+        self.run = run
+        self.max_searches = max_searches
+        self.deadline = deadline
+        self.searches = 0
+
+    def try_search(self) -> bool:
+        """Reserve one search for this row if both row share and global budget allow."""
+        if self.exhausted():
+            return False
+        if not self.run.try_search():
+            return False
+        self.searches += 1
+        return True
+
+    def exhausted(self) -> bool:
+        """True once further searches are not worth making (row share, global caps or deadline)."""
+        if self.max_searches is not None and self.searches >= self.max_searches:
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return True
+        if not self.run.llm_available():
+            return True  # Nothing left to read the results with
+        return self.run.remaining_searches() < 1 or self.run.remaining_time() <= 0
+
+    def llm_available(self) -> bool:
+        return self.run.llm_available()
+
+    def reserve_llm(self, estimated_tokens: int = EST_TOKENS_PER_LLM_CALL) -> bool:
+        return self.run.reserve_llm(estimated_tokens)
+
+    def record_llm(self, response, prompt: str = "", reserved: int = 0) -> None:
+        self.run.record_llm(response_tokens(response, prompt), reserved)
@@ -0,0 +1,151 @@
+"""
+Cheap-model-first extraction cascade.
+
+The first extraction runs on the cheap model (`llm`). Only fields it leaves out, returns
+below the confidence threshold or with malformed entries, or every field when its JSON
+fails to parse, are re-asked of the stronger model (`escalation_llm`). `CASCADE_STATS` tracks
+the escalation rate and the cost saved versus running every call on the strong model.
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# USD per 1M tokens (input, output)
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+
+def model_name(llm) -> str:
+    """Best-effort model name of a chat model (stand-ins fall back to the class name)."""
+    for attr in ("model_name", "model"):
+        name = getattr(llm, attr, None)
+        if isinstance(name, str) and name:
+            return name
+    return type(llm).__name__
+
+
+def usage_tokens(response, prompt: str = "") -> tuple[int, int]:
+    """(input, output) tokens from response usage, or ~4 chars/token if missing."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    if usage.get("input_tokens") is not None and usage.get("output_tokens") is not None:
+        return int(usage["input_tokens"]), int(usage["output_tokens"])
+    content = getattr(response, "content", "") or ""
+    return len(prompt) // 4, len(content) // 4
+
+
+def call_cost(model: str, input_tokens: int, output_tokens: int) -> float:
+    """USD cost of one call; 0.0 for models without a known price (e.g. local stand-ins)."""
+    price_in, price_out = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (input_tokens * price_in + output_tokens * price_out) / 1_000_000
+
+
+def fields_to_escalate(data: dict, fields: list[str], threshold: float, estimate: bool = False) -> list[str]:
+    """
+    Fields the cheap model did not answer well enough: all of them if the JSON failed to
+    parse, otherwise those it left out, returned with a malformed entry or an empty value,
+    or returned below `threshold`.
+
+    With `estimate` (the estimation pass, where low confidence is expected) only missing,
+    empty and malformed answers are escalated.
+    """
+    if not data:
+        return list(fields)
+
+    escalate: list[str] = []
+    answered: set[str] = set()
+    for upd in data.get("updates", []):
+        if not isinstance(upd, dict):
+            continue
+        field = upd.get("field")
+        if field not in fields or field in answered:
+            continue
+        answered.add(field)
+        value = upd.get("value")
+        try:
+            confidence = float(upd.get("confidence", 0.0))
+        except (TypeError, ValueError):
+            escalate.append(field)
+            continue
+        if not isinstance(value, str) or not value.strip():
+            escalate.append(field)
+        elif confidence < threshold and not estimate:
+            escalate.append(field)
+    escalate.extend(f for f in fields if f not in answered)
+    return escalate
+
+
+def merge_updates(cheap: dict, strong: dict, escalated: list[str]) -> dict:
+    """Replace cheap answers for escalated fields with the strong model's, when it gave one."""
+    strong_by_field = {
+        u.get("field"): u for u in strong.get("updates", []) if isinstance(u, dict) and u.get("field") in escalated
+    }
+    merged = [
+        u for u in (cheap or {}).get("updates", [])
+        if not (isinstance(u, dict) and u.get("field") in strong_by_field)
+    ]
+    merged.extend(strong_by_field.values())
+    return {"updates": merged}
+
+
+class CascadeStats:
+    """Thread-safe escalation and cost counters for a run."""
+
+    def __init__(self):
+        self.calls = 0
+        self.fields_requested = 0
+        self.fields_escalated = 0
+        self.escalation_calls = 0
+        self.actual_cost = 0.0
+        self.all_strong_cost = 0.0
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        *,
+        fields: int,
+        escalated: int,
+        cheap_model: str,
+        strong_model: str | None,
+        cheap_tokens: tuple[int, int],
+        strong_tokens: tuple[int, int] | None = None,
+    ) -> None:
+        """Record one cascaded extraction (cheap call + optional strong call)."""
+        cost = call_cost(cheap_model, *cheap_tokens)
+        # What this extraction would have cost if the strong model had done it alone
+        baseline = call_cost(strong_model, *cheap_tokens) if strong_model else cost
+        if strong_tokens is not None and strong_model:
+            cost += call_cost(strong_model, *strong_tokens)
+        with self._lock:
+            self.calls += 1
+            self.fields_requested += fields
+            self.fields_escalated += escalated
+            self.escalation_calls += 1 if strong_tokens is not None else 0
+            self.actual_cost += cost
+            self.all_strong_cost += baseline
+
+    @property
+    def escalation_rate(self) -> float:
+        return self.fields_escalated / self.fields_requested if self.fields_requested else 0.0
+
+    @property
+    def cost_saved(self) -> float:
+        return self.all_strong_cost - self.actual_cost
+
+    def summary(self) -> str:
+        return (
+            f"{self.calls} extractions, {self.fields_escalated}/{self.fields_requested} fields escalated "
+            f"({self.escalation_rate:.0%}, {self.escalation_calls} strong calls), "
+            f"cost ${self.actual_cost:.4f} vs ${self.all_strong_cost:.4f} all-strong "
+            f"(saved ${self.cost_saved:.4f})"
+        )
+
+
+# Process-wide cascade stats
+CASCADE_STATS = CascadeStats()
@@ -0,0 +1,224 @@
+"""
+Column-oriented fill: one property across many chemicals at once.
+
+Many properties (boiling point, CAS number, GHS flags) are listed for whole families of
+gases on one compiled reference page. `fill_column` takes one column from
+`HMIS_COLUMN_SPEC` and the rows still missing it, runs a few aggregate searches per
+group of chemicals and asks for a numbered chemical → value table in one LLM call.
+For a sparse column this costs roughly `max_queries` searches and one LLM call per
+`group_size` rows instead of a full 47-field row pass each.
+
+Answers are applied through `should_update_field` and recorded as provenance with
+tier "column"; anything below the confidence threshold is left for the row pipeline.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import SystemMessage, HumanMessage
+
+from gas_agent.schema import HMISGasRecord, COLUMN_INDEX_TO_FIELD, FIELD_TO_DESCRIPTION
+from gas_agent.config import DEFAULT_CONFIG
+from gas_agent.prompts import COLUMN_PREFIX, build_column_prompt
+from gas_agent.content_store import content_hash
+from gas_agent.tokens import PROMPT_STATS
+from gas_agent.latency import call_with_deadline, make_tavily_search
+from gas_agent.utils import (
+    normalize_search_results,
+    parse_json_response,
+    build_context_from_results,
+    should_update_field,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GROUP_SIZE = 20
+DEFAULT_MAX_QUERIES = 3
+MAX_QUERY_CHARS = 380  # Tavily rejects queries over 400 characters
+
+
+def resolve_column(column: str | int) -> str:
+    """Schema field name for a field name or an `HMIS_COLUMN_SPEC` column index."""
+    if isinstance(column, int):
+        if column not in COLUMN_INDEX_TO_FIELD:
+            raise ValueError(f"Unknown column index {column}")
+        return COLUMN_INDEX_TO_FIELD[column]
+    if column not in FIELD_TO_DESCRIPTION:
+        raise ValueError(f"Unknown column {column!r}")
+    return column
+
+
+def _label(record: HMISGasRecord) -> str:
+    """Chemical as listed in the prompt: name plus formula/CAS to disambiguate."""
+    name = record.chemical_name or record.sub_system_filter_formula or "chemical"
+    extras = [
+        v for v in (record.sub_system_filter_formula, record.cas_number)
+        if v and v != name
+    ]
+    return f"{name} ({', '.join(extras)})" if extras else name
+
+
+def column_queries(field: str, names: list[str], max_queries: int = DEFAULT_MAX_QUERIES) -> list[str]:
+    """Up to `max_queries` aggregate queries, each naming a slice of the group."""
+    term = FIELD_TO_DESCRIPTION.get(field, field).split(";")[0].split(":")[0]
+    per_query = max(1, -(-len(names) // max(1, max_queries)))
+    queries = []
+    for i in range(0, len(names), per_query):
+        query = f"{term} table of gases"
+        for name in names[i:i + per_query]:
+            if len(query) + len(name) + 2 > MAX_QUERY_CHARS:
+                break
+            query += f", {name}"
+        queries.append(query)
+    return queries[:max_queries]
+
+
+def _fill_group(
+    records: list[HMISGasRecord],
+    rows: list[int],
+    field: str,
+    *,
+    llm,
+    search_tool,
+    config: dict,
+) -> list[tuple[int, dict]]:
+    """Searches + one LLM call for a group of rows; returns [(row, update)]."""
+    names = [records[i].chemical_name or records[i].sub_system_filter_formula or "chemical" for i in rows]
+    max_results = config["max_results_per_search"]
+
+    results: list[dict] = []
+    seen: set[str] = set()
+    for query in column_queries(field, names, config["max_queries"]):
+        try:
+            found = call_with_deadline(
+                lambda query=query: search_tool.invoke({"query": query}),
+                provider="tavily",
+                node="column_search",
+                timeout_s=config.get("search_timeout_s"),
+            )
+        except Exception as e:
+            logger.warning(f"✗ Search failed: {e}")
+            continue
+        for r in normalize_search_results(found).get("results", [])[:max_results]:
+            if not isinstance(r, dict):
+                continue
+            digest = content_hash(r.get("content", ""))
+            if digest not in seen:
+                seen.add(digest)
+                results.append(r)
+
+    context = build_context_from_results(results, len(results), config["max_snippet_chars"])
+    if not context:
+        context = "No search results available. Provide estimates based on chemical knowledge."
+    prompt = build_column_prompt(field, [_label(records[i]) for i in rows], context)
+    messages = [SystemMessage(content=COLUMN_PREFIX), HumanMessage(content=prompt)]
+    response = call_with_deadline(
+        lambda: llm.invoke(messages),
+        provider="openai",
+        node="column_extract",
+        timeout_s=config.get("llm_timeout_s"),
+    )
+    PROMPT_STATS.record(COLUMN_PREFIX, prompt, response)
+
+    data = parse_json_response((response.content or "").strip())
+    updates = []
+    for entry in data.get("values", []) if data else []:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            n = int(entry.get("row"))
+        except (TypeError, ValueError):
+            continue
+        if 1 <= n <= len(rows):
+            updates.append((rows[n - 1], entry))
+    logger.info(f"✓ {field}: {len(updates)}/{len(rows)} values from {len(results)} pages")
+    return updates
+
+
+def fill_column(
+    records: list[HMISGasRecord],
+    column: str | int,
+    *,
+    rows: list[int] | None = None,
+    provenance: dict[int, dict[str, dict]] | None = None,
+    llm=None,
+    search_tool=None,
+    model: str = DEFAULT_CONFIG["model"],
+    group_size: int = DEFAULT_GROUP_SIZE,
+    max_queries: int = DEFAULT_MAX_QUERIES,
+    confidence_threshold: float = 0.6,
+    overwrite_delta: float = 0.2,
+    max_snippet_chars: int = 1500,
+    max_results_per_search: int = 5,
+    search_timeout_s: float | None = DEFAULT_CONFIG["search_timeout_s"],
+    llm_timeout_s: float | None = DEFAULT_CONFIG["llm_timeout_s"],
+    max_workers: int = 4,
+) -> tuple[list[HMISGasRecord], dict[int, dict[str, dict]]]:
+    """
+    Fill one column for every row (or `rows`) where it is empty.
+
+    Returns (records, provenance), where provenance maps row index → field →
+    {value, confidence, source_url, tier}. Pass an existing `provenance` to extend it;
+    a value is only written when `should_update_field` accepts it.
+    """
+    from langchain_openai import ChatOpenAI
+
+    field = resolve_column(column)
+    records = list(records)
+    provenance = provenance if provenance is not None else {}
+    candidates = rows if rows is not None else range(len(records))
+    missing = [i for i in candidates if not (getattr(records[i], field) or "").strip()]
+    if not missing:
+        logger.info(f"No rows missing {field}")
+        return records, provenance
+
+    llm = llm or ChatOpenAI(model=model, temperature=0, request_timeout=llm_timeout_s)
+    search_tool = search_tool or make_tavily_search(max_results_per_search, search_timeout_s)
+    config = {
+        "confidence_threshold": confidence_threshold,
+        "overwrite_delta": overwrite_delta,
+        "max_snippet_chars": max_snippet_chars,
+        "max_results_per_search": max_results_per_search,
+        "max_queries": max_queries,
+        "search_timeout_s": search_timeout_s,
+        "llm_timeout_s": llm_timeout_s,
+    }
+
+    groups = [missing[i:i + group_size] for i in range(0, len(missing), max(1, group_size))]
+    logger.info(f"📊 Column {field}: {len(missing)} rows in {len(groups)} groups")
+
+    updates: list[tuple[int, dict]] = []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(groups)))) as pool:
+        futures = [
+            pool.submit(_fill_group, records, group, field, llm=llm, search_tool=search_tool, config=config)
+            for group in groups
+        ]
+        for future in futures:
+            try:
+                updates.extend(future.result())
+            except Exception as e:
+                logger.warning(f"✗ Column group failed: {e}")
+
+    filled_count = 0
+    for idx, entry in updates:
+        value = (entry.get("value") or "").strip() if isinstance(entry.get("value"), str) else ""
+        try:
+            confidence = float(entry.get("confidence", 0.5))
+        except (TypeError, ValueError):
+            continue
+        if not value or "UNKNOWN" in value.upper():
+            continue
+        filled = provenance.get(idx, {})
+        if should_update_field(field, confidence, filled, config):
+            records[idx] = records[idx].model_copy(update={field: value})
+            filled = provenance.setdefault(idx, filled)
+            filled[field] = {
+                "value": value,
+                "confidence": confidence,
+                "source_url": entry.get("source_url"),
+                "tier": "column",
+            }
+            filled_count += 1
+
+    logger.info(f"✓ Column {field}: {filled_count}/{len(missing)} filled, {len(missing) - filled_count} left for row passes")
+    return records, provenance
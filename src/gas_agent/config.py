@@ -4,13 +4,14 @@ from gas_agent.references import GAS_SUPPLIERS, SAFETY_STANDARDS, REGULATORY_BOD
 from gas_agent.graph_state import TierName
 
 TIERS = {
+    "local_sds": None,  # Offline: served by SDSCorpus, not Tavily
     "suppliers": GAS_SUPPLIERS,
     "standards": SAFETY_STANDARDS,
     "regulatory": REGULATORY_BODIES,
     "open_web": None,
 }
 
-TIER_ORDER: list[TierName] = ["suppliers", "standards", "regulatory", "open_web"]
+TIER_ORDER: list[TierName] = ["local_sds", "suppliers", "standards", "regulatory", "open_web"]
 
 DEFAULT_CONFIG = {
     "confidence_threshold": 0.3,  # Accept lower confidence answers
@@ -18,4 +19,10 @@ DEFAULT_CONFIG = {
     "max_snippet_chars": 1500,
     "max_results_per_search": 5,
     "enable_open_web_fallback": True,
+    "search_timeout_s": 20.0,  # Per-call deadline for Tavily
+    "llm_timeout_s": 60.0,  # Per-call deadline for extraction LLM calls
+    "hedge_requests": False,  # Duplicate calls slower than their p95
+    "model": "gpt-4o-mini",  # First-pass extraction model
+    "escalation_model": None,  # Stronger model for low-confidence fields (e.g. "gpt-4o")
+    "max_fields_per_shard": 12,  # Estimation prompts are split into parallel shards of this size
 }
@@ -0,0 +1,144 @@
+"""
+URL/content-hash store that deduplicates search results across tiers and rows.
+
+Tier domain lists overlap and the open web often returns the same SDS pages as the
+supplier tier. For each (chemical, page content hash) the store remembers which fields
+have already been extracted from it and what came back. `extract_fields_node` uses it
+to reuse earlier answers without an LLM call and to leave already-read pages out of
+later contexts. Re-fills call `forget` first so they never replay the answers they are
+meant to replace.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_PAGES = 20000
+
+_WS_RE = re.compile(r"\s+")
+
+
+def content_hash(content: str) -> str:
+    """Stable hash of page content, insensitive to whitespace differences."""
+    normalized = _WS_RE.sub(" ", content or "").strip().lower()
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def chemical_key(chemical: str) -> str:
+    return _WS_RE.sub(" ", (chemical or "").strip().lower())
+
+
+class ContentStore:
+    """Thread-safe LRU of pages → attempted fields and cached extractions."""
+
+    def __init__(self, max_pages: int = DEFAULT_MAX_PAGES):
+        self.max_pages = max_pages
+        # (chemical, hash) -> {"attempted": set[field], "extractions": {field: update}, "urls": set[url]}
+        self._pages: OrderedDict[tuple[str, str], dict] = OrderedDict()
+        # (chemical, url) -> content hash, for cited source_urls; evicted with the page
+        self._url_hash: dict[tuple[str, str], str] = {}
+        self.hits = 0  # Fields answered from cache
+        self.pages_skipped = 0  # Results left out of a context
+        self._lock = threading.Lock()
+
+    def _page(self, key: tuple[str, str]) -> dict:
+        page = self._pages.get(key)
+        if page is None:
+            page = {"attempted": set(), "extractions": {}, "urls": set()}
+            self._pages[key] = page
+            if len(self._pages) > self.max_pages:
+                (chem, digest), evicted = self._pages.popitem(last=False)
+                for url in evicted["urls"]:
+                    if self._url_hash.get((chem, url)) == digest:
+                        del self._url_hash[(chem, url)]
+        else:
+            self._pages.move_to_end(key)
+        return page
+
+    def split_results(
+        self, chemical: str, results: list[dict], fields: list[str]
+    ) -> tuple[list[dict], list[dict]]:
+        """
+        Partition results for extracting `fields`.
+
+        Returns:
+            (new_results, cached_updates): results with at least one field not yet
+            attempted on that page, and cached extractions for `fields` from pages
+            that were already read.
+        """
+        chem = chemical_key(chemical)
+        wanted = set(fields)
+        new_results: list[dict] = []
+        cached: dict[str, dict] = {}
+
+        with self._lock:
+            for r in results:
+                if not isinstance(r, dict):
+                    continue
+                digest = content_hash(r.get("content", ""))
+                page = self._pages.get((chem, digest))
+                if page is None:
+                    new_results.append(r)
+                    continue
+                self._pages.move_to_end((chem, digest))
+                for field, update in page["extractions"].items():
+                    if field in wanted:
+                        best = cached.get(field)
+                        if best is None or update.get("confidence", 0) > best.get("confidence", 0):
+                            cached[field] = update
+                if wanted - page["attempted"]:
+                    new_results.append(r)
+                else:
+                    self.pages_skipped += 1
+            self.hits += len(cached)
+
+        return new_results, list(cached.values())
+
+    def record(self, chemical: str, results: list[dict], fields: list[str], updates: list[dict]) -> None:
+        """Remember that `fields` were extracted from `results` and which page each answer came from."""
+        chem = chemical_key(chemical)
+        with self._lock:
+            url_to_key: dict[str, tuple[str, str]] = {}
+            for r in results:
+                if not isinstance(r, dict):
+                    continue
+                key = (chem, content_hash(r.get("content", "")))
+                page = self._page(key)
+                page["attempted"].update(fields)
+                if r.get("url"):
+                    url_to_key[r["url"]] = key
+                    page["urls"].add(r["url"])
+                    self._url_hash[(chem, r["url"])] = key[1]
+
+            for upd in updates:
+                if not isinstance(upd, dict):
+                    continue
+                url = upd.get("source_url") or ""
+                key = url_to_key.get(url)
+                if key is None and (chem, url) in self._url_hash:
+                    key = (chem, self._url_hash[(chem, url)])
+                if key is None or upd.get("field") not in fields:
+                    continue
+                page = self._pages.get(key)
+                if page is not None:
+                    page["extractions"][upd["field"]] = dict(upd)
+
+    def forget(self, chemical: str, fields: list[str]) -> None:
+        """Drop cached extractions of `fields` for a chemical so they are read again (re-fills)."""
+        chem = chemical_key(chemical)
+        wanted = set(fields)
+        with self._lock:
+            for (page_chem, _), page in self._pages.items():
+                if page_chem != chem:
+                    continue
+                page["attempted"] -= wanted
+                for field in wanted.intersection(page["extractions"]):
+                    del page["extractions"][field]
+
+    def summary(self) -> str:
+        return f"{len(self._pages)} pages, {self.hits} cached field answers, {self.pages_skipped} pages skipped"
+
+
+# Process-wide store shared across rows
+CONTENT_STORE = ContentStore()
@@ -0,0 +1,305 @@
+"""
+Local SDS document corpus: offline search tier backed by an inverted index.
+
+Supplier SDS exports (.txt / .html / .htm) in a folder are split into passages and
+indexed in memory. `refresh()` re-indexes only files whose size or mtime changed, and
+the index can be persisted as JSON so a new process does not re-tokenize the corpus.
+`invoke()` returns the same shape as `TavilySearch.invoke`, so results flow through
+`normalize_search_results` and `extract_fields_node` unchanged.
+
+Every SDS shares the section vocabulary ("hazards identification", "properties"), so
+BM25 alone always returns something. With `identity` terms (chemical name, formula,
+CAS) only documents about that chemical are searched: the CAS number must match the one
+in Section 1 when both are known, otherwise the product-name line (or file name) must be
+exactly the chemical's name. "Hydrogen" does not match "Hydrogen chloride, anhydrous".
+A chemical that is not in the corpus gets no results.
+"""
+
+import html
+import json
+import logging
+import math
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+CORPUS_SUFFIXES = {".txt", ".html", ".htm"}
+
+_TAG_RE = re.compile(r"<(script|style)\b.*?</\1>|<[^>]+>", re.IGNORECASE | re.DOTALL)
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-.][a-z0-9]+)*")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it",
+    "of", "on", "or", "the", "to", "with",
+}
+
+_CAS_RE = re.compile(r"\b\d{2,7}-\d{2}-\d\b")
+_PRODUCT_LINE_RE = re.compile(
+    r"^\s*(?:product(?:\s+(?:name|identifier))?|trade\s+name|chemical\s+name|substance(?:\s+name)?"
+    r"|material(?:\s+name)?)\s*[:\-]\s*(?P<name>.+)$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_NAME_END_RE = re.compile(r"[,;(\[]")  # "Nitrogen, compressed", "Argon (refrigerated)"
+# What a product line or file name may carry after the name itself: formula, CAS, filler words
+_FORMULA_TOKEN_RE = re.compile(r"(?=.*\d)[a-z][a-z0-9]{1,9}")  # sih4, ash3, nf3
+_NAME_FILLER = {"cas", "no", "number", "sds", "msds", "safety", "data", "sheet"}
+
+# BM25 parameters
+_K1 = 1.2
+_B = 0.75
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase word tokens; keeps CAS numbers (7440-37-1) and formulas intact."""
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def _read_document(path: Path) -> str:
+    """Read a corpus file as plain text, stripping HTML markup if needed."""
+    text = path.read_text(encoding="utf-8", errors="ignore")
+    if path.suffix.lower() in {".html", ".htm"}:
+        text = html.unescape(_TAG_RE.sub(" ", text))
+    return re.sub(r"[ \t\r\f\v]+", " ", text).strip()
+
+
+def _split_passages(text: str, size: int) -> list[str]:
+    """Split text into ~`size` char passages on paragraph/line boundaries."""
+    passages: list[str] = []
+    current = ""
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if current and len(current) + len(line) + 1 > size:
+            passages.append(current)
+            current = ""
+        current = f"{current}\n{line}" if current else line
+        while len(current) > size:
+            passages.append(current[:size])
+            current = current[size:]
+    if current:
+        passages.append(current)
+    return passages
+
+
+class SDSCorpus:
+    """In-memory inverted index (BM25) over a folder of SDS text/HTML exports."""
+
+    def __init__(
+        self,
+        root: str | Path,
+        *,
+        index_path: str | Path | None = None,
+        passage_chars: int = 1500,
+    ):
+        self.root = Path(root)
+        self.index_path = Path(index_path) if index_path else None
+        self.passage_chars = passage_chars
+
+        self._files: dict[str, dict] = {}  # path -> {mtime_ns, size, passages: [ids]}
+        self._passages: dict[int, dict] = {}  # id -> {path, text, tf, length}
+        self._postings: dict[str, dict[int, int]] = defaultdict(dict)  # term -> {id: tf}
+        self._total_length = 0
+        self._next_id = 0
+
+        if self.index_path and self.index_path.exists():
+            self._load()
+        self.refresh()
+
+    # ------------------------------------------------------------------
+    # Indexing
+    # ------------------------------------------------------------------
+
+    def refresh(self) -> int:
+        """Incrementally re-index new, changed and deleted files. Returns files re-indexed."""
+        seen: set[str] = set()
+        changed = 0
+
+        if self.root.is_dir():
+            for path in sorted(self.root.rglob("*")):
+                if path.suffix.lower() not in CORPUS_SUFFIXES or not path.is_file():
+                    continue
+                key = str(path)
+                seen.add(key)
+                stat = path.stat()
+                meta = self._files.get(key)
+                if meta and meta["mtime_ns"] == stat.st_mtime_ns and meta["size"] == stat.st_size:
+                    continue
+                self._remove_file(key)
+                self._add_file(path, stat.st_mtime_ns, stat.st_size)
+                changed += 1
+
+        for key in [k for k in self._files if k not in seen]:
+            self._remove_file(key)
+            changed += 1
+
+        if changed:
+            logger.info(f"📚 Indexed {changed} SDS files ({len(self._files)} total, {len(self._passages)} passages)")
+            if self.index_path:
+                self._save()
+        return changed
+
+    def _add_file(self, path: Path, mtime_ns: int, size: int) -> None:
+        ids: list[int] = []
+        for text in _split_passages(_read_document(path), self.passage_chars):
+            tf = Counter(tokenize(text))
+            if tf:
+                ids.append(self._add_passage(str(path), text, dict(tf)))
+        self._files[str(path)] = {"mtime_ns": mtime_ns, "size": size, "passages": ids}
+
+    def _add_passage(self, path: str, text: str, tf: dict[str, int], pid: int | None = None) -> int:
+        if pid is None:
+            pid = self._next_id
+        self._next_id = max(self._next_id, pid + 1)
+        length = sum(tf.values())
+        self._passages[pid] = {"path": path, "text": text, "tf": tf, "length": length}
+        for term, count in tf.items():
+            self._postings[term][pid] = count
+        self._total_length += length
+        return pid
+
+    def _remove_file(self, key: str) -> None:
+        meta = self._files.pop(key, None)
+        if not meta:
+            return
+        for pid in meta["passages"]:
+            passage = self._passages.pop(pid, None)
+            if not passage:
+                continue
+            self._total_length -= passage["length"]
+            for term in passage["tf"]:
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                postings.pop(pid, None)
+                if not postings:
+                    del self._postings[term]
+
+    def _save(self) -> None:
+        data = {
+            "root": str(self.root),
+            "passage_chars": self.passage_chars,
+            "files": self._files,
+            "passages": {str(pid): p for pid, p in self._passages.items()},
+        }
+        tmp = self.index_path.with_suffix(self.index_path.suffix + ".tmp")
+        tmp.write_text(json.dumps(data), encoding="utf-8")
+        tmp.replace(self.index_path)
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"✗ Could not load SDS index, rebuilding: {e}")
+            return
+        if data.get("root") != str(self.root) or data.get("passage_chars") != self.passage_chars:
+            return
+        for pid, p in data.get("passages", {}).items():
+            self._add_passage(p["path"], p["text"], p["tf"], pid=int(pid))
+        self._files = data.get("files", {})
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def _document_identity(self, key: str) -> tuple[set[str], list[list[str]]]:
+        """(CAS numbers, product names as token lists) from a file's first passage and name."""
+        meta = self._files[key]
+        first = self._passages.get(meta["passages"][0]) if meta["passages"] else None
+        text = first["text"] if first else ""
+        names = [
+            tokenize(_NAME_END_RE.split(m.group("name"), 1)[0])
+            for m in _PRODUCT_LINE_RE.finditer(text)
+        ]
+        names.append(tokenize(Path(key).stem.replace("_", " ")))
+        return set(_CAS_RE.findall(text)), [n for n in names if n]
+
+    def _identity_documents(self, identity: list[str]) -> set[str]:
+        """
+        Files about the chemical named by `identity`. A known CAS number decides when the
+        document states one; otherwise a product name must be the chemical's whole name,
+        followed by nothing but a formula, a CAS number or filler ("SDS").
+        """
+        cas = {c for term in identity if term for c in _CAS_RE.findall(term)}
+        names = [tokenize(term) for term in identity if term and not _CAS_RE.fullmatch(term.strip())]
+        names = [n for n in names if n]
+
+        def is_suffix(token: str) -> bool:
+            return token in _NAME_FILLER or bool(_CAS_RE.fullmatch(token) or _FORMULA_TOKEN_RE.fullmatch(token))
+
+        matched: set[str] = set()
+        for key in self._files:
+            doc_cas, doc_names = self._document_identity(key)
+            if cas and doc_cas:
+                if cas & doc_cas:
+                    matched.add(key)
+                continue
+            if any(
+                doc_name[:len(name)] == name and all(is_suffix(t) for t in doc_name[len(name):])
+                for name in names
+                for doc_name in doc_names
+            ):
+                matched.add(key)
+        return matched
+
+    def search(
+        self,
+        query: str,
+        max_results: int = 5,
+        max_per_document: int = 2,
+        identity: list[str] | None = None,
+    ) -> list[dict]:
+        """
+        BM25 search over passages, best first, at most `max_per_document` per file.
+        With `identity`, only documents about that chemical are considered.
+        """
+        n = len(self._passages)
+        if not n:
+            return []
+        avg_length = self._total_length / n
+        allowed = self._identity_documents(identity) if identity is not None else None
+        if allowed is not None and not allowed:
+            return []
+
+        scores: dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for pid, tf in postings.items():
+                norm = tf + _K1 * (1 - _B + _B * self._passages[pid]["length"] / avg_length)
+                scores[pid] += idf * tf * (_K1 + 1) / norm
+
+        results: list[dict] = []
+        per_document: Counter = Counter()
+        for pid, score in sorted(scores.items(), key=lambda kv: kv[1], reverse=True):
+            passage = self._passages[pid]
+            if allowed is not None and passage["path"] not in allowed:
+                continue
+            if per_document[passage["path"]] >= max_per_document:
+                continue
+            per_document[passage["path"]] += 1
+            path = Path(passage["path"]).resolve()
+            results.append({
+                "url": path.as_uri(),
+                "title": path.stem,
+                "content": passage["text"],
+                "score": round(score, 4),
+            })
+            if len(results) >= max_results:
+                break
+        return results
+
+    def invoke(self, params: dict) -> dict:
+        """TavilySearch-compatible entry point: {"query": ..., "identity": [...]} → {"results": [...]}."""
+        return {
+            "query": params.get("query", ""),
+            "results": self.search(
+                params.get("query", ""), params.get("max_results", 5), identity=params.get("identity")
+            ),
+        }
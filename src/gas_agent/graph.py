@@ -1,5 +1,7 @@
 """LangGraph workflow construction."""
 
+from functools import lru_cache
+
 from langgraph.graph import StateGraph, END
 
 from gas_agent.graph_state import SearchState
@@ -44,3 +46,9 @@ def build_search_graph() -> StateGraph:
     )
     
     return workflow.compile()
+
+
+@lru_cache(maxsize=1)
+def get_search_graph():
+    """Compiled graph, built once per process; compiled graphs hold no run state."""
+    return build_search_graph()
@@ -1,48 +1,105 @@
 """Main entry point for LangGraph search agent."""
 
 import logging
+import time
 
-from gas_agent.schema import HMISGasRecord, get_empty_field_names
+from gas_agent.schema import HMISGasRecord, CompactRecord, get_empty_field_names
 from gas_agent.graph_state import SearchState
-from gas_agent.config import TIERS
-from gas_agent.graph import build_search_graph
+from gas_agent.config import TIERS, TIER_ORDER, DEFAULT_CONFIG
+from gas_agent.graph import get_search_graph
+from gas_agent.budget import prioritize_fields
+from gas_agent.latency import LATENCY, make_tavily_search
+from gas_agent.content_store import CONTENT_STORE
 
 logger = logging.getLogger(__name__)
 
 
-def fill_record_with_graph(
+def fill_record_with_graph(record: HMISGasRecord, **kwargs) -> HMISGasRecord:
+    """
+    Fill empty fields using 2-phase LangGraph pipeline.
+
+    Accepts the same keyword arguments as `fill_record_with_provenance`.
+    """
+    return fill_record_with_provenance(record, **kwargs)[0]
+
+
+def fill_record_with_provenance(
     record: HMISGasRecord,
     *,
     llm=None,
     search_tool=None,
+    escalation_llm=None,
+    model: str = DEFAULT_CONFIG["model"],
+    escalation_model: str | None = DEFAULT_CONFIG["escalation_model"],
     confidence_threshold: float = 0.6,
     overwrite_delta: float = 0.2,
     max_snippet_chars: int = 1500,
     max_results_per_search: int = 5,
     enable_open_web_fallback: bool = True,
-) -> HMISGasRecord:
-    """Fill empty fields using 2-phase LangGraph pipeline."""
+    search_timeout_s: float | None = DEFAULT_CONFIG["search_timeout_s"],
+    llm_timeout_s: float | None = DEFAULT_CONFIG["llm_timeout_s"],
+    hedge_requests: bool = DEFAULT_CONFIG["hedge_requests"],
+    max_fields_per_shard: int = DEFAULT_CONFIG["max_fields_per_shard"],
+    pending_fields: list[str] | None = None,
+    corpus=None,
+    budget=None,
+    content_store=CONTENT_STORE,
+    neighbors=None,
+    prior_provenance: dict[str, dict] | None = None,
+) -> tuple[HMISGasRecord, dict[str, dict]]:
+    """
+    Fill empty fields and return (record, provenance).
+
+    Provenance maps each filled field to {value, confidence, source_url, tier}.
+
+    If `pending_fields` is given (e.g. cells flagged by `validate_records`), only those
+    fields are cleared and re-filled; all other values are kept as-is.
+    If `corpus` (an `SDSCorpus`) is given, the offline local_sds tier is searched first.
+    If `budget` (a `RowBudget`) is given, searches stop once it is spent and the remaining
+    fields get a single estimation pass.
+    Each search/LLM call is bounded by `search_timeout_s` / `llm_timeout_s`; with
+    `hedge_requests` a duplicate is sent once a call outlives its observed p95.
+    `content_store` (process-wide by default, None to disable) skips pages already read
+    for the same chemical and reuses their extractions without another LLM call; cached
+    extractions of `pending_fields` are dropped first so re-fills read the pages again.
+    Extraction runs on `llm` / `model` first; with `escalation_llm` / `escalation_model`
+    set, only fields below `confidence_threshold` (or unparseable) go to the stronger model.
+    With `neighbors` (a `NeighborIndex`), estimates are seeded with the verified values of
+    the most similar filled chemicals, and the filled row is added to the index. On a
+    re-fill, pass the row's earlier provenance as `prior_provenance` so the index sees
+    which of its other cells were filled by the agent.
+    """
     from langchain_openai import ChatOpenAI
-    from langchain_tavily import TavilySearch
     
-    empty_fields = get_empty_field_names(record)
+    if pending_fields is not None:
+        record = HMISGasRecord(**{**record.model_dump(), **{f: None for f in pending_fields}})
+        empty_fields = list(pending_fields)
+        if content_store is not None:
+            # A re-fill must not replay the cached extractions it is meant to replace
+            chemical = record.chemical_name or record.sub_system_filter_formula or "chemical"
+            content_store.forget(chemical, pending_fields)
+    else:
+        empty_fields = get_empty_field_names(record)
+    empty_fields = prioritize_fields(empty_fields)
     if not empty_fields:
         logger.info("No empty fields")
-        return record
+        return record, {}
     
     logger.info(f"Starting pipeline: {len(empty_fields)} empty fields")
     
     # Create tools once (reused across all nodes)
-    llm = llm or ChatOpenAI(model="gpt-4o-mini", temperature=0)
-    search_tool = search_tool or TavilySearch(max_results=max_results_per_search)
+    llm = llm or ChatOpenAI(model=model, temperature=0, request_timeout=llm_timeout_s)
+    if escalation_llm is None and escalation_model:
+        escalation_llm = ChatOpenAI(model=escalation_model, temperature=0, request_timeout=llm_timeout_s)
+    search_tool = search_tool or make_tavily_search(max_results_per_search, search_timeout_s)
     
     initial_state: SearchState = {
         "record": record,
-        "current_record": HMISGasRecord(**record.model_dump()),
+        "current_record": CompactRecord.from_record(record, pending=empty_fields),
         "pending_fields": empty_fields.copy(),
         "filled_fields": {},
-        "tier": "suppliers",
-        "tier_index": 0,
+        "tier": TIER_ORDER[0] if corpus is not None else TIER_ORDER[1],
+        "tier_index": 0 if corpus is not None else 1,
         "general_search_count": 0,
         "search_results": {},
         "config": {
@@ -51,14 +108,25 @@ def fill_record_with_graph(
             "max_snippet_chars": max_snippet_chars,
             "max_results_per_search": max_results_per_search,
             "enable_open_web_fallback": enable_open_web_fallback,
+            "search_timeout_s": search_timeout_s,
+            "llm_timeout_s": llm_timeout_s,
+            "hedge_requests": hedge_requests,
+            "max_fields_per_shard": max_fields_per_shard,
         },
         "llm": llm,
+        "escalation_llm": escalation_llm,
         "search_tool": search_tool,
+        "corpus": corpus,
+        "budget": budget,
+        "content_store": content_store,
+        "neighbors": neighbors,
         "_next": "search_tier",
     }
     
-    graph = build_search_graph()
+    graph = get_search_graph()
+    started = time.monotonic()
     final_state = graph.invoke(initial_state)
+    LATENCY.record("row", "fill_record_with_graph", time.monotonic() - started)
     
     # Summary
     filled = len(final_state["filled_fields"])
@@ -68,4 +136,8 @@ def fill_record_with_graph(
     
     logger.info(f"✓ Pipeline complete: {filled} filled ({tier_filled} tier, {general_filled} general), {pending} unfilled")
     
-    return final_state["current_record"]
+    filled_record = final_state["current_record"].to_record()
+    if neighbors is not None:
+        prior = {f: p for f, p in (prior_provenance or {}).items() if f not in empty_fields}
+        neighbors.add(filled_record, {**prior, **final_state["filled_fields"]})
+    return filled_record, final_state["filled_fields"]
@@ -4,17 +4,17 @@ LangGraph state schema for tiered domain search.
 
 from typing import TypedDict, Literal, Any
 
-from gas_agent.schema import HMISGasRecord
+from gas_agent.schema import HMISGasRecord, CompactRecord
 
 
-TierName = Literal["suppliers", "standards", "regulatory", "open_web"]
+TierName = Literal["local_sds", "suppliers", "standards", "regulatory", "open_web"]
 
 
 class SearchState(TypedDict):
     """LangGraph state for multi-tier record filling."""
     # Records
     record: HMISGasRecord
-    current_record: HMISGasRecord
+    current_record: CompactRecord  # Converted back to HMISGasRecord when the graph ends
     
     # Field tracking
     pending_fields: list[str]
@@ -33,7 +33,12 @@ class SearchState(TypedDict):
     
     # Tools (created once, reused)
     llm: Any
+    escalation_llm: Any  # Stronger model for low-confidence fields, or None
     search_tool: Any
+    corpus: Any  # SDSCorpus or None (local_sds tier)
+    budget: Any  # RowBudget or None (unlimited)
+    content_store: Any  # ContentStore shared across tiers/rows, or None
+    neighbors: Any  # NeighborIndex for few-shot estimation examples, or None
     
     # Router control
     _next: str  # "search_tier", "search_general", "end"
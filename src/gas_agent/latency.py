@@ -0,0 +1,228 @@
+"""
+Per-call deadlines, hedged requests and tail-latency statistics.
+
+`call_with_deadline` runs a Tavily/LLM call on a shared thread pool. With a timeout it
+gives up after `timeout_s` (the stalled call is abandoned, its result discarded). With
+hedging it sends a duplicate once the call has run longer than the provider/node p95
+and returns whichever copy finishes first. Every call is timed into `LATENCY`.
+
+A running thread cannot be cancelled, so abandoned calls rely on client-side timeouts
+(`request_timeout` for ChatOpenAI, `make_tavily_search` for Tavily) to finish. If too
+many are still stuck, the pool is replaced so new calls never queue behind them.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+# Samples kept per (provider, node); p95 needs a few before hedging kicks in
+MAX_SAMPLES = 500
+MIN_SAMPLES_FOR_HEDGE = 20
+
+MAX_WORKERS = 64
+MAX_ABANDONED = MAX_WORKERS // 2  # Stuck calls tolerated before the pool is replaced
+
+_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="gas-agent-call")
+_abandoned = 0
+_pool_lock = threading.Lock()
+
+
+def _submit(fn):
+    with _pool_lock:
+        return _EXECUTOR.submit(fn)
+
+
+def _abandon(futures) -> None:
+    """Give up on futures: cancel queued ones, count running ones until they finish."""
+    global _EXECUTOR, _abandoned
+    for future in futures:
+        if future.cancel():
+            continue
+        with _pool_lock:
+            _abandoned += 1
+        future.add_done_callback(_release)
+
+    with _pool_lock:
+        if _abandoned >= MAX_ABANDONED:
+            logger.warning(f"⚠️  {_abandoned} abandoned calls still running, replacing call pool")
+            _EXECUTOR.shutdown(wait=False)  # Stuck threads exit when their client times out
+            _EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="gas-agent-call")
+            _abandoned = 0
+
+
+def _release(_future) -> None:
+    global _abandoned
+    with _pool_lock:
+        _abandoned = max(0, _abandoned - 1)
+
+
+class CallTimeout(TimeoutError):
+    """A search/LLM call did not finish within its deadline."""
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    pos = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[pos]
+
+
+class LatencyStats:
+    """Thread-safe rolling latency samples keyed by (provider, node)."""
+
+    def __init__(self, max_samples: int = MAX_SAMPLES):
+        self._samples: dict[tuple[str, str], deque] = defaultdict(lambda: deque(maxlen=max_samples))
+        self._counts: dict[tuple[str, str], dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, node: str, seconds: float, outcome: str = "ok") -> None:
+        """Add one sample; outcome is "ok", "error", "timeout" or "hedge_won"."""
+        with self._lock:
+            self._samples[(provider, node)].append(seconds)
+            self._counts[(provider, node)][outcome] += 1
+
+    def percentile(self, provider: str, node: str, q: float) -> float | None:
+        with self._lock:
+            samples = list(self._samples.get((provider, node), ()))
+        return _percentile(samples, q) if samples else None
+
+    def hedge_delay(self, provider: str, node: str) -> float | None:
+        """p95 for (provider, node), or None until enough samples exist."""
+        with self._lock:
+            samples = list(self._samples.get((provider, node), ()))
+        if len(samples) < MIN_SAMPLES_FOR_HEDGE:
+            return None
+        return _percentile(samples, 0.95)
+
+    def snapshot(self) -> dict[str, dict]:
+        """{"provider/node": {count, p50, p95, p99, max, outcomes}} for reporting."""
+        with self._lock:
+            items = [(k, list(v), dict(self._counts[k])) for k, v in self._samples.items()]
+        report = {}
+        for (provider, node), samples, outcomes in sorted(items):
+            if not samples:
+                continue
+            report[f"{provider}/{node}"] = {
+                "count": len(samples),
+                "p50": _percentile(samples, 0.50),
+                "p95": _percentile(samples, 0.95),
+                "p99": _percentile(samples, 0.99),
+                "max": max(samples),
+                "outcomes": outcomes,
+            }
+        return report
+
+    def summary(self) -> str:
+        lines = []
+        for key, s in self.snapshot().items():
+            lines.append(
+                f"{key}: n={s['count']} p50={s['p50']:.2f}s p95={s['p95']:.2f}s "
+                f"p99={s['p99']:.2f}s max={s['max']:.2f}s {s['outcomes']}"
+            )
+        return "\n".join(lines)
+
+
+# Process-wide latency stats
+LATENCY = LatencyStats()
+
+
+def call_with_deadline(
+    fn,
+    *,
+    provider: str,
+    node: str,
+    timeout_s: float | None = None,
+    hedge: bool = False,
+    hedge_delay_s: float | None = None,
+    on_hedge: Callable[[], bool] | None = None,
+):
+    """
+    Run `fn()` with an optional deadline and optional hedging.
+
+    Args:
+        fn: Zero-argument callable (e.g. `lambda: llm.invoke(messages)`)
+        provider / node: Keys for latency stats (e.g. "tavily", "search_tier")
+        timeout_s: Give up after this many seconds and raise CallTimeout
+        hedge: Send one duplicate after the p95 delay; first success wins
+        hedge_delay_s: Fixed hedge delay instead of the observed p95
+        on_hedge: Called before sending the duplicate, e.g. to charge it to a budget;
+            returning False skips the hedge
+    """
+    start = time.monotonic()
+
+    if timeout_s is None and not hedge:
+        try:
+            result = fn()
+        except Exception:
+            LATENCY.record(provider, node, time.monotonic() - start, "error")
+            raise
+        LATENCY.record(provider, node, time.monotonic() - start)
+        return result
+
+    deadline = start + timeout_s if timeout_s is not None else None
+    delay = hedge_delay_s if hedge_delay_s is not None else LATENCY.hedge_delay(provider, node)
+    hedge_at = start + delay if hedge and delay is not None else None
+
+    primary = _submit(fn)
+    pending = {primary}
+    last_error: Exception | None = None
+
+    while pending:
+        now = time.monotonic()
+        wake = [t for t in (deadline, hedge_at) if t is not None]
+        timeout = max(0.0, min(wake) - now) if wake else None
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as e:
+                last_error = e
+                continue
+            _abandon(pending)  # The slower copy
+            outcome = "hedge_won" if future is not primary else "ok"
+            LATENCY.record(provider, node, time.monotonic() - start, outcome)
+            return result
+
+        now = time.monotonic()
+        if deadline is not None and now >= deadline:
+            _abandon(pending)
+            LATENCY.record(provider, node, now - start, "timeout")
+            raise CallTimeout(f"{provider}/{node} exceeded {timeout_s:.1f}s")
+
+        if hedge_at is not None and now >= hedge_at and pending:
+            hedge_at = None
+            if on_hedge is None or on_hedge():
+                logger.info(f"⏱️  Hedging {provider}/{node} after {now - start:.1f}s")
+                pending.add(_submit(fn))
+
+    LATENCY.record(provider, node, time.monotonic() - start, "error")
+    raise last_error
+
+
+class TavilyClientSearch:
+    """
+    Search tool on `tavily.TavilyClient`, whose HTTP requests time out client-side.
+    Same `invoke(params)` → {"results": [...]} interface as `TavilySearch`.
+    """
+
+    def __init__(self, max_results: int = 5, timeout_s: float | None = None):
+        from tavily import TavilyClient
+
+        self.max_results = max_results
+        self.client = TavilyClient() if timeout_s is None else TavilyClient(timeout=timeout_s)
+
+    def invoke(self, params: dict) -> dict:
+        params = dict(params)
+        query = params.pop("query")
+        params.setdefault("max_results", self.max_results)
+        return self.client.search(query, **params)
+
+
+def make_tavily_search(max_results: int = 5, timeout_s: float | None = None) -> TavilyClientSearch:
+    """Default web search tool; calls give up client-side after `timeout_s` seconds."""
+    return TavilyClientSearch(max_results=max_results, timeout_s=timeout_s)
@@ -2,6 +2,7 @@
 CLI entrypoint: run HMIS table fill pipeline.
 """
 
+import os
 import sys
 from pathlib import Path
 
@@ -15,6 +16,8 @@ def main() -> None:
     Simple CLI: 
     - Default: Fill entire table from docs/HMIS TABLE.xlsx → docs/HMIS_filled.xlsx
     - --dryrun: Process first 2 rows WITH LLM/search (for testing)
+    - --serve: Run the fill server (GAS_AGENT_HOST/GAS_AGENT_PORT or GAS_AGENT_SOCKET)
+    - --batch: Full run through one OpenAI Batch API job (nightly refresh)
     """
     # Check for dry-run flag
     dry_run = "--dryrun" in sys.argv
@@ -22,6 +25,19 @@ def main() -> None:
     # Default paths
     input_path = Path("docs/HMIS TABLE.xlsx")
     output_path = Path("docs/HMIS_filled.xlsx")
+    sds_corpus_dir = Path("docs/sds")  # Optional local SDS exports (offline tier)
+    sds_corpus_dir = sds_corpus_dir if sds_corpus_dir.is_dir() else None
+    
+    if "--serve" in sys.argv:
+        from gas_agent.server import serve, DEFAULT_HOST, DEFAULT_PORT
+
+        serve(
+            host=os.getenv("GAS_AGENT_HOST", DEFAULT_HOST),
+            port=int(os.getenv("GAS_AGENT_PORT", DEFAULT_PORT)),
+            socket_path=os.getenv("GAS_AGENT_SOCKET") or None,
+            sds_corpus_dir=sds_corpus_dir,
+        )
+        return
     
     # Validate input exists
     if not input_path.exists():
@@ -29,6 +45,19 @@ def main() -> None:
         print("Please ensure docs/HMIS TABLE.xlsx exists")
         sys.exit(1)
     
+    if "--batch" in sys.argv:
+        from gas_agent.batch import run_batch_pipeline
+
+        print("🌙 BATCH RUN: all searches, then one Batch API extraction job")
+        records = run_batch_pipeline(
+            input_path,
+            output_path=output_path,
+            max_rows=2 if dry_run else None,
+            sds_corpus_dir=sds_corpus_dir,
+        )
+        print(f"✓ Batch run complete: {len(records)} rows filled and saved to {output_path}")
+        return
+    
     # Run pipeline
     if dry_run:
         print("🧪 DRY RUN MODE: Processing first 2 rows WITH LLM + web search")
@@ -39,6 +68,7 @@ def main() -> None:
             input_path,
             output_path=output_path,
             max_rows=2,
+            sds_corpus_dir=sds_corpus_dir,
         )
         print()
         print(f"✓ Dry run complete: {len(records)} rows filled and saved to {output_path}")
@@ -52,6 +82,7 @@ def main() -> None:
         records = run_pipeline(
             input_path,
             output_path=output_path,
+            sds_corpus_dir=sds_corpus_dir,
         )
         print()
         print(f"✓ Complete: {len(records)} rows filled and saved to {output_path}")
@@ -0,0 +1,200 @@
+"""
+Nearest-neighbor few-shot seeding for the estimation pass.
+
+`NeighborIndex` keeps the verified values of already-filled rows together with a small
+binary feature vector per chemical (formula elements, hazard class words, physical form,
+GHS pictogram flags, H-codes, flammability/reactivity ratings). Before
+`extract_general_node` estimates the fields no search could fill, it retrieves the k
+most similar chemicals by weighted Jaccard similarity and passes their values for those
+fields as compact analogues, so estimates are anchored to real table data.
+
+Verified values are the original table values and answers taken from search results;
+estimates (tier "general") and "(review required)" cells are never used as examples.
+"""
+
+import re
+import threading
+
+import numpy as np
+
+from gas_agent.schema import HMISGasRecord
+from gas_agent.validation import GHS_HAZARD_CODES, _parse_flags
+from gas_agent.content_store import chemical_key
+
+DEFAULT_K = 3
+MIN_SIMILARITY = 0.15
+MAX_EXAMPLE_VALUE_CHARS = 60
+
+# Feature kind → weight in the similarity
+FEATURE_WEIGHTS = {
+    "el": 1.0,    # formula element
+    "hc": 1.5,    # hazard class word
+    "form": 1.0,  # physical form (CG / LG)
+    "ghs": 2.0,   # GHS pictogram flag set
+    "h": 1.0,     # H-statement code
+    "nfpa": 0.5,  # flammability / reactivity rating
+}
+
+# Identity columns: never copied from one chemical to another
+IDENTITY_FIELDS = {"row_index", "sub_system_filter_formula", "chemical_name", "sub_system_formula_2", "cas_number"}
+
+_ELEMENT_RE = re.compile(r"[A-Z][a-z]?")
+_WORD_RE = re.compile(r"[a-z]{3,}")
+_H_CODE_RE = re.compile(r"H\d{3}")
+_DIGIT_RE = re.compile(r"\d")
+_HC_STOPWORDS = {
+    "gas", "gases", "and", "category", "cat", "class", "the", "under", "pressure", "review", "required", "estimated",
+}
+
+
+def _is_verified(value: str | None, provenance: dict | None) -> bool:
+    if not value or "(review required)" in value.lower():
+        return False
+    return (provenance or {}).get("tier") != "general"
+
+
+def record_features(record) -> set[str]:
+    """Feature strings ("kind:value") for a HMISGasRecord or CompactRecord."""
+    features: set[str] = set()
+
+    for field in ("sub_system_filter_formula", "sub_system_formula_2"):
+        formula = getattr(record, field, None) or ""
+        # Only formula-looking cells (no spaces/lowercase words), e.g. "SiH4", "NF3"
+        if formula and " " not in formula.strip() and not _WORD_RE.search(formula):
+            features.update(f"el:{el}" for el in _ELEMENT_RE.findall(formula))
+
+    hazard_class = (getattr(record, "hazard_class", None) or "").lower()
+    features.update(f"hc:{w}" for w in _WORD_RE.findall(hazard_class) if w not in _HC_STOPWORDS)
+
+    form = (getattr(record, "physical_form", None) or "").lower()
+    if "lg" in form.split() or "liquef" in form:
+        features.add("form:LG")
+    elif "cg" in form.split() or "compress" in form:
+        features.add("form:CG")
+
+    ghs_fields = list(GHS_HAZARD_CODES)
+    flags = _parse_flags([getattr(record, f, None) for f in ghs_fields])
+    features.update(f"ghs:{f}" for f, flag in zip(ghs_fields, flags) if flag == 1.0)
+
+    statement = (getattr(record, "hazardous_statement", None) or "").upper()
+    features.update(f"h:{code}" for code in _H_CODE_RE.findall(statement))
+
+    for field in ("flammability", "reactivity"):
+        digit = _DIGIT_RE.search(getattr(record, field, None) or "")
+        if digit:
+            features.add(f"nfpa:{field}={digit.group()}")
+
+    return features
+
+
+class NeighborIndex:
+    """Thread-safe similarity index over filled rows; grows as rows are filled."""
+
+    def __init__(self, k: int = DEFAULT_K, min_similarity: float = MIN_SIMILARITY):
+        self.k = k
+        self.min_similarity = min_similarity
+        self._names: list[str] = []
+        self._keys: list[str] = []
+        self._values: list[dict[str, str]] = []
+        self._features: list[set[str]] = []
+        self._by_key: dict[str, int] = {}
+        self._vocab: dict[str, int] = {}
+        self._matrix: np.ndarray | None = None  # (rows, vocab) 0/1, rebuilt lazily
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    @classmethod
+    def from_records(cls, records: list[HMISGasRecord], **kwargs) -> "NeighborIndex":
+        index = cls(**kwargs)
+        for record in records:
+            index.add(record)
+        return index
+
+    def add(self, record, provenance: dict[str, dict] | None = None) -> None:
+        """Add or replace a chemical's verified values (`provenance` from a fill, if any)."""
+        name = record.chemical_name or record.sub_system_filter_formula
+        if not name:
+            return
+        provenance = provenance or {}
+        values = {
+            field: value
+            for field in HMISGasRecord.model_fields
+            if field not in IDENTITY_FIELDS
+            and _is_verified(value := getattr(record, field, None), provenance.get(field))
+        }
+        features = record_features(record)
+        if not values or not features:
+            return
+
+        key = chemical_key(name)
+        with self._lock:
+            for feature in features:
+                self._vocab.setdefault(feature, len(self._vocab))
+            idx = self._by_key.get(key)
+            if idx is None:
+                self._by_key[key] = len(self._names)
+                self._names.append(name)
+                self._keys.append(key)
+                self._values.append(values)
+                self._features.append(features)
+            else:
+                self._values[idx] = values
+                self._features[idx] = features
+            self._matrix = None
+
+    def _weights(self) -> np.ndarray:
+        weights = np.empty(len(self._vocab))
+        for feature, j in self._vocab.items():
+            weights[j] = FEATURE_WEIGHTS[feature.split(":", 1)[0]]
+        return weights
+
+    def nearest(self, record, fields: list[str] | None = None, k: int | None = None) -> list[tuple[float, str, dict]]:
+        """
+        The k most similar other chemicals as (similarity, name, values), best first.
+        With `fields`, only chemicals holding a verified value for one of them count.
+        """
+        k = k or self.k
+        name = record.chemical_name or record.sub_system_filter_formula or ""
+        query = record_features(record)
+
+        with self._lock:
+            if not self._names or not query:
+                return []
+            if self._matrix is None:
+                self._matrix = np.zeros((len(self._names), len(self._vocab)))
+                for i, features in enumerate(self._features):
+                    self._matrix[i, [self._vocab[f] for f in features]] = 1.0
+            matrix, weights = self._matrix, self._weights()
+            q = np.zeros(len(self._vocab))
+            q[[self._vocab[f] for f in query if f in self._vocab]] = 1.0
+            unseen = sum(FEATURE_WEIGHTS[f.split(":", 1)[0]] for f in query if f not in self._vocab)
+            names, keys, values = list(self._names), list(self._keys), list(self._values)
+
+        # Weighted Jaccard against every row at once
+        intersection = matrix @ (weights * q)
+        union = matrix @ weights + float(weights @ q) + unseen - intersection
+        scores = np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+        own_key = chemical_key(name)
+        wanted = set(fields or ())
+        out = []
+        for i in np.argsort(-scores, kind="stable"):
+            if scores[i] < self.min_similarity or len(out) >= k:
+                break
+            if keys[i] == own_key or (wanted and not wanted.intersection(values[i])):
+                continue
+            out.append((float(scores[i]), names[i], values[i]))
+        return out
+
+    def few_shot_context(self, record, fields: list[str], k: int | None = None) -> str:
+        """Compact examples block for the estimation prompt, or "" if no close neighbors."""
+        lines = []
+        for score, name, values in self.nearest(record, fields, k):
+            shown = [
+                f"{f}={values[f][:MAX_EXAMPLE_VALUE_CHARS]}" for f in fields if f in values
+            ]
+            if shown:
+                lines.append(f"- {name} (similarity {score:.2f}): " + "; ".join(shown))
+        return "\n".join(lines)
@@ -1,23 +1,208 @@
 """LangGraph nodes for search and extraction."""
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 from langchain_core.messages import SystemMessage, HumanMessage
 
-from gas_agent.schema import HMISGasRecord, FIELD_TO_DESCRIPTION
+from gas_agent.schema import FIELD_TO_DESCRIPTION
 from gas_agent.graph_state import SearchState
 from gas_agent.config import TIERS, TIER_ORDER
-from gas_agent.prompts import EXTRACTION_SYSTEM_PROMPT, build_extraction_prompt
+from gas_agent.prompts import EXTRACTION_PREFIX, build_extraction_prompt
+from gas_agent.cascade import CASCADE_STATS, fields_to_escalate, merge_updates, model_name, usage_tokens
+from gas_agent.tokens import PROMPT_STATS
+from gas_agent.budget import EST_TOKENS_PER_LLM_CALL
+from gas_agent.latency import call_with_deadline
 from gas_agent.utils import (
     normalize_search_results,
     parse_json_response,
     build_context_from_results,
-    should_update_field,
+    build_general_context,
+    apply_tier_updates,
+    apply_general_updates,
+    shard_fields,
 )
 
 logger = logging.getLogger(__name__)
 
 
+def tier_search_params(record, tier: str, max_results: int) -> dict:
+    """Search params for one tier: corpus query for local_sds, Tavily query + domains otherwise."""
+    chemical = record.chemical_name or record.sub_system_filter_formula or "chemical"
+    if tier == "local_sds":
+        identity = [record.chemical_name, record.sub_system_filter_formula, record.cas_number]
+        return {
+            "query": f"{chemical} {record.cas_number or ''} properties hazards identification",
+            "max_results": max_results,
+            "identity": [term for term in identity if term],  # Only SDSs of this chemical
+        }
+    
+    domains = TIERS[tier]
+    query = f"{chemical} safety data sheet properties hazards" if domains else f"{chemical} SDS MSDS"
+    search_params = {"query": query}
+    if domains:
+        search_params["include_domains"] = domains[:10]
+    return search_params
+
+
+def general_search_query(record, pending: list[str]) -> str:
+    """General web query built from the top pending fields."""
+    chemical = record.chemical_name or record.sub_system_filter_formula or "chemical"
+    field_terms = " ".join([FIELD_TO_DESCRIPTION.get(f, f).split()[0] for f in pending[:5]])
+    return f"{chemical} chemical properties {field_terms} SDS"
+
+
+def _invoke_search(state: SearchState, node: str, search_tool, params: dict, provider: str = "tavily"):
+    """Search call with the configured deadline/hedging; a hedged duplicate costs a search."""
+    config = state["config"]
+    budget = state.get("budget")
+    charge = budget.try_search if budget is not None and provider == "tavily" else None
+    return call_with_deadline(
+        lambda: search_tool.invoke(params),
+        provider=provider,
+        node=node,
+        timeout_s=config.get("search_timeout_s"),
+        hedge=config.get("hedge_requests", False),
+        on_hedge=charge,
+    )
+
+
+def _invoke_llm(state: SearchState, node: str, prompt: str, llm=None):
+    """
+    Extraction LLM call with the configured deadline/hedging. With a budget, tokens are
+    reserved first (None if the cap is reached) and settled with the actual usage.
+    """
+    config = state["config"]
+    llm = llm or state["llm"]
+    messages = [
+        SystemMessage(content=EXTRACTION_PREFIX),
+        HumanMessage(content=prompt)
+    ]
+    budget = state.get("budget")
+    if budget is not None and not budget.reserve_llm():
+        return None
+
+    def charge_hedge() -> bool:
+        # The duplicate's prompt tokens are spent whichever copy wins
+        return budget.reserve_llm(len(EXTRACTION_PREFIX + prompt) // 4)
+
+    # A failed or abandoned call keeps its reservation: it may still be billed
+    response = call_with_deadline(
+        lambda: llm.invoke(messages),
+        provider="openai",
+        node=node,
+        timeout_s=config.get("llm_timeout_s"),
+        hedge=config.get("hedge_requests", False),
+        on_hedge=charge_hedge if budget is not None else None,
+    )
+    PROMPT_STATS.record(EXTRACTION_PREFIX, prompt, response)
+    if budget is not None:
+        budget.record_llm(response, prompt, reserved=EST_TOKENS_PER_LLM_CALL)
+    return response
+
+
+def _few_shot_examples(state: SearchState, fields: list[str]) -> str:
+    """Similar chemicals' verified values for `fields`, if a neighbor index is set."""
+    neighbors = state.get("neighbors")
+    if neighbors is None:
+        return ""
+    return neighbors.few_shot_context(state["current_record"], fields)
+
+
+def _run_extraction(
+    state: SearchState,
+    node: str,
+    chemical: str,
+    fields: list[str],
+    context: str,
+    is_general: bool = False,
+) -> dict:
+    """
+    Extract `fields` with the cheap model, escalating weak fields to `escalation_llm`.
+    Returns parsed {"updates": [...]} or {} when nothing usable came back.
+    """
+    budget = state.get("budget")
+    if budget is not None and not budget.llm_available():
+        logger.info(f"💸 Token budget exhausted")
+        return {}
+    
+    examples = _few_shot_examples(state, fields) if is_general else ""
+    prompt = build_extraction_prompt(chemical, fields, context, is_general=is_general, examples=examples)
+    response = _invoke_llm(state, node, prompt)
+    if response is None:
+        logger.info(f"💸 Token budget exhausted")
+        return {}
+    data = parse_json_response((response.content or "").strip())
+    
+    strong_llm = state.get("escalation_llm")
+    cheap_model = model_name(state["llm"])
+    if strong_llm is None:
+        CASCADE_STATS.record(
+            fields=len(fields), escalated=0, cheap_model=cheap_model, strong_model=None,
+            cheap_tokens=usage_tokens(response, prompt),
+        )
+        return data
+    
+    escalate = fields_to_escalate(data, fields, state["config"]["confidence_threshold"], estimate=is_general)
+    strong_tokens = None
+    if escalate and (budget is None or budget.llm_available()):
+        logger.info(f"⬆️  Escalating {len(escalate)}/{len(fields)} fields to {model_name(strong_llm)}")
+        strong_examples = _few_shot_examples(state, escalate) if is_general else ""
+        strong_prompt = build_extraction_prompt(
+            chemical, escalate, context, is_general=is_general, examples=strong_examples
+        )
+        try:
+            strong_response = _invoke_llm(state, f"{node}_escalated", strong_prompt, llm=strong_llm)
+            if strong_response is not None:
+                strong_tokens = usage_tokens(strong_response, strong_prompt)
+                strong_data = parse_json_response((strong_response.content or "").strip())
+                if strong_data:
+                    data = merge_updates(data, strong_data, escalate)
+        except Exception as e:
+            logger.warning(f"✗ Escalation failed, keeping cheap answers: {e}")
+    
+    CASCADE_STATS.record(
+        fields=len(fields), escalated=len(escalate), cheap_model=cheap_model,
+        strong_model=model_name(strong_llm), cheap_tokens=usage_tokens(response, prompt),
+        strong_tokens=strong_tokens,
+    )
+    return data
+
+
+def _run_sharded_extraction(
+    state: SearchState,
+    node: str,
+    chemical: str,
+    fields: list[str],
+    context: str,
+    is_general: bool = False,
+) -> dict:
+    """
+    Split fields into category-coherent shards and extract them in parallel LLM calls.
+    Latency is set by the largest shard; a failed shard only loses its own fields.
+    """
+    shards = shard_fields(fields, state["config"]["max_fields_per_shard"])
+    if len(shards) <= 1:
+        return _run_extraction(state, node, chemical, fields, context, is_general)
+    
+    logger.info(f"🧩 {len(fields)} fields in {len(shards)} parallel shards")
+    updates: list[dict] = []
+    with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+        futures = [
+            pool.submit(_run_extraction, state, node, chemical, shard, context, is_general)
+            for shard in shards
+        ]
+        for future in futures:
+            try:
+                data = future.result()
+            except Exception as e:
+                logger.warning(f"✗ Shard failed: {e}")
+                continue
+            updates.extend(data.get("updates", []) if data else [])
+    
+    return {"updates": updates} if updates else {}
+
+
 def search_tier_node(state: SearchState) -> dict:
     """Perform Tavily search for current tier."""
     tier = state["tier"]
@@ -25,17 +210,31 @@ def search_tier_node(state: SearchState) -> dict:
     search_tool = state["search_tool"]
     
     chemical = record.chemical_name or record.sub_system_filter_formula or "chemical"
-    domains = TIERS[tier]
+    if not state["pending_fields"]:
+        return {}  # Nothing left to look for: do not spend a search
+    search_params = tier_search_params(record, tier, state["config"]["max_results_per_search"])
     
-    query = f"{chemical} safety data sheet properties hazards" if domains else f"{chemical} SDS MSDS"
-    logger.info(f"🔍 {tier}: {chemical}")
-    
-    search_params = {"query": query}
-    if domains:
-        search_params["include_domains"] = domains[:10]
+    if tier == "local_sds":
+        # Offline tier: same result shape as Tavily, no network
+        search_tool = state.get("corpus")
+        if search_tool is None:
+            search_results = state["search_results"].copy()
+            search_results[tier] = {"results": []}
+            return {"search_results": search_results}
+        logger.info(f"📚 {tier}: {chemical}")
+    else:
+        logger.info(f"🔍 {tier}: {chemical}")
+        
+        budget = state.get("budget")
+        if budget is not None and not budget.try_search():
+            logger.info(f"💸 Search budget exhausted, skipping {tier}")
+            search_results = state["search_results"].copy()
+            search_results[tier] = {"results": []}
+            return {"search_results": search_results}
     
     try:
-        results = search_tool.invoke(search_params)
+        provider = "local_sds" if tier == "local_sds" else "tavily"
+        results = _invoke_search(state, "search_tier", search_tool, search_params, provider)
         search_results = state["search_results"].copy()
         search_results[tier] = normalize_search_results(results)
         
@@ -55,7 +254,6 @@ def extract_fields_node(state: SearchState) -> dict:
     record = state["record"]
     current_record = state["current_record"]
     config = state["config"]
-    llm = state["llm"]
     
     target_fields = state["pending_fields"]
     if not target_fields:
@@ -68,59 +266,47 @@ def extract_fields_node(state: SearchState) -> dict:
         logger.info(f"ℹ️  No results")
         return {}
     
-    # Build context and prompt
-    context = build_context_from_results(
-        results,
-        config["max_results_per_search"],
-        config["max_snippet_chars"]
-    )
-    
     chemical = record.chemical_name or record.sub_system_filter_formula or "chemical"
-    prompt = build_extraction_prompt(chemical, target_fields, context)
+    
+    # Skip pages already read for these fields; reuse what was extracted from them
+    cached_updates: list[dict] = []
+    store = state.get("content_store")
+    if store is not None:
+        results, cached_updates = store.split_results(
+            chemical, results[:config["max_results_per_search"]], target_fields
+        )
+        if cached_updates:
+            logger.info(f"♻️  {len(cached_updates)} fields from already-read pages")
     
     try:
-        response = llm.invoke([
-            SystemMessage(content=EXTRACTION_SYSTEM_PROMPT),
-            HumanMessage(content=prompt)
-        ])
+        data = {}
+        if results:
+            context = build_context_from_results(
+                results,
+                config["max_results_per_search"],
+                config["max_snippet_chars"]
+            )
+            data = _run_extraction(state, "extract_tier", chemical, target_fields, context)
+            if store is not None and data:
+                store.record(chemical, results, target_fields, data.get("updates", []))
+        else:
+            logger.info(f"ℹ️  All results already read")
         
-        data = parse_json_response((response.content or "").strip())
-        if not data:
+        if not data and not cached_updates:
             return {}
         
-        updates = data.get("updates", [])
+        updates = cached_updates + data.get("updates", [])
         
         # Apply updates
-        new_record_data = current_record.model_dump()
+        new_record = current_record.copy()
         filled = state["filled_fields"].copy()
-        pending = state["pending_fields"].copy()
-        
-        filled_count = 0
-        for upd in updates:
-            field = upd.get("field")
-            value = upd.get("value", "").strip()
-            confidence = upd.get("confidence", 0.5)
-            source_url = upd.get("source_url")
-            
-            if not field or not value or "UNKNOWN" in value.upper() or field not in target_fields:
-                continue
-            
-            if should_update_field(field, confidence, filled, config):
-                new_record_data[field] = value
-                filled[field] = {
-                    "value": value,
-                    "confidence": confidence,
-                    "source_url": source_url,
-                    "tier": tier
-                }
-                if field in pending:
-                    pending.remove(field)
-                filled_count += 1
+        filled_count = apply_tier_updates(current_record, new_record, filled, updates, tier, config)
         
+        pending = [f for f in target_fields if new_record.is_pending(f)]
         logger.info(f"✓ {filled_count} filled, {len(pending)} pending")
         
         return {
-            "current_record": HMISGasRecord(**new_record_data),
+            "current_record": new_record,
             "filled_fields": filled,
             "pending_fields": pending,
         }
@@ -140,16 +326,18 @@ def search_general_node(state: SearchState) -> dict:
     if not pending or search_count >= 3:
         return {}
     
-    chemical = record.chemical_name or record.sub_system_filter_formula or "chemical"
-    
-    # Build query from top pending fields
-    field_terms = " ".join([FIELD_TO_DESCRIPTION.get(f, f).split()[0] for f in pending[:5]])
-    query = f"{chemical} chemical properties {field_terms} SDS"
+    query = general_search_query(record, pending)
     
     logger.info(f"🔍 General {search_count + 1}/3")
     
+    budget = state.get("budget")
+    if budget is not None and not budget.try_search():
+        # Out of budget: leave no results so extract_general estimates
+        logger.info(f"💸 Search budget exhausted, estimating")
+        return {"general_search_count": search_count + 1}
+    
     try:
-        results = search_tool.invoke({"query": query})
+        results = _invoke_search(state, "search_general", search_tool, {"query": query})
         search_results = state["search_results"].copy()
         search_results[f"general_{search_count}"] = normalize_search_results(results)
         
@@ -166,7 +354,6 @@ def extract_general_node(state: SearchState) -> dict:
     """Extract remaining fields from general search (mark as review required)."""
     pending = state["pending_fields"]
     search_count = state["general_search_count"]
-    llm = state["llm"]
     record = state["record"]
     current_record = state["current_record"]
     
@@ -177,63 +364,25 @@ def extract_general_node(state: SearchState) -> dict:
     search_data = state["search_results"].get(tier_key, {})
     results = search_data.get("results", [])
     
-    # Build context (use what's available, even if empty)
-    context_parts = []
-    if results:
-        for r in results[:5]:
-            if isinstance(r, dict):
-                content = r.get("content", "")[:800]
-                if content:
-                    context_parts.append(content)
-    
-    context = "\n\n".join(context_parts)[:3000] if context_parts else "No search results available. Provide estimates based on chemical knowledge."
+    context = build_general_context(results)
     
     chemical = record.chemical_name or record.sub_system_filter_formula or "chemical"
-    prompt = build_extraction_prompt(chemical, pending[:20], context, is_general=True)
     
     try:
-        response = llm.invoke([
-            SystemMessage(content=EXTRACTION_SYSTEM_PROMPT),
-            HumanMessage(content=prompt)
-        ])
-        
-        data = parse_json_response((response.content or "").strip())
+        data = _run_sharded_extraction(state, "extract_general", chemical, pending, context, is_general=True)
         if not data:
             return {}
         
         updates = data.get("updates", [])
         
-        new_record_data = current_record.model_dump()
+        new_record = current_record.copy()
         filled = state["filled_fields"].copy()
-        new_pending = state["pending_fields"].copy()
-        
-        for upd in updates:
-            field = upd.get("field")
-            value = upd.get("value", "").strip()
-            confidence = upd.get("confidence", 0.2)
-            
-            # Accept ANY value for general search (final pass)
-            if field in pending and value and value.upper() not in ["NULL", "NONE", ""]:
-                # Mark with (review required) for low confidence or no search results
-                if confidence < 0.4 or not results:
-                    labeled_value = f"{value} (review required)"
-                else:
-                    labeled_value = value
-                    
-                new_record_data[field] = labeled_value
-                filled[field] = {
-                    "value": labeled_value,
-                    "confidence": confidence,
-                    "source_url": None,
-                    "tier": "general"
-                }
-                if field in new_pending:
-                    new_pending.remove(field)
+        apply_general_updates(current_record, new_record, filled, updates, has_results=bool(results))
         
         return {
-            "current_record": HMISGasRecord(**new_record_data),
+            "current_record": new_record,
             "filled_fields": filled,
-            "pending_fields": new_pending,
+            "pending_fields": [f for f in pending if new_record.is_pending(f)],
         }
     except Exception as e:
         logger.warning(f"✗ Extraction failed: {e}")
@@ -248,7 +397,21 @@ def router_node(state: SearchState) -> dict:
     search_count = state["general_search_count"]
     config = state["config"]
     
-    max_tier = 3 if config["enable_open_web_fallback"] else 2
+    budget = state.get("budget")
+    
+    # Every field filled: no more tiers or general searches
+    if not pending:
+        logger.info(f"✓ Complete")
+        return {"_next": "end"}
+    
+    # Budget spent: one estimation pass for what is left, then stop
+    if budget is not None and budget.exhausted():
+        if search_count == 0:
+            return {"_next": "search_general"}
+        logger.info(f"✓ Complete (budget exhausted)")
+        return {"_next": "end"}
+    
+    max_tier = len(TIER_ORDER) - 1 if config["enable_open_web_fallback"] else len(TIER_ORDER) - 2
     
     # Phase 1: Tier searches
     if tier_index < max_tier:
@@ -257,7 +420,7 @@ def router_node(state: SearchState) -> dict:
         return {"tier_index": new_tier_index, "tier": new_tier, "_next": "search_tier"}
     
     # Phase 2: General searches (max 3)
-    if pending and search_count < 3:
+    if search_count < 3:
         return {"_next": "search_general"}
     
     # Done
@@ -5,9 +5,18 @@ Pipeline: load HMIS Excel → fill empty cells via LangGraph → export.
 from pathlib import Path
 
 from gas_agent.loader import load_hmis_excel
-from gas_agent.graph_agent import fill_record_with_graph
+from gas_agent.corpus import SDSCorpus
+from gas_agent.budget import RunBudget, prioritize_records, row_weight
+from gas_agent.graph_agent import fill_record_with_provenance
 from gas_agent.schema import HMISGasRecord
 from gas_agent.export import export_records_to_excel
+from gas_agent.tokens import PROMPT_STATS
+from gas_agent.latency import LATENCY
+from gas_agent.cascade import CASCADE_STATS
+from gas_agent.content_store import CONTENT_STORE
+from gas_agent.validation import label_unparsed, normalize_units, validate_records
+from gas_agent.neighbors import NeighborIndex
+from gas_agent.columns import fill_column
 
 
 def run_pipeline(
@@ -17,6 +26,13 @@ def run_pipeline(
     sheet_name: str | None = None,
     max_rows: int | None = None,
     dry_run: bool = False,
+    validate: bool = True,
+    sds_corpus_dir: str | Path | None = None,
+    max_search_calls: int | None = None,
+    max_llm_tokens: int | None = None,
+    time_budget_s: float | None = None,
+    escalation_model: str | None = None,
+    few_shot: bool = True,
 ) -> list[HMISGasRecord]:
     """
     Load HMIS Excel, fill empty cells using LangGraph pipeline, optionally export.
@@ -27,6 +43,16 @@ def run_pipeline(
         sheet_name: Sheet to read (default: first sheet)
         max_rows: Process only this many rows (default: all)
         dry_run: If True, load and return records without calling LLM/search
+        validate: If True, normalize units and re-fill cells flagged by table-wide validation
+        sds_corpus_dir: Folder of local SDS text/HTML exports, searched offline before suppliers
+        max_search_calls: Global cap on Tavily calls for the whole run (default: unlimited)
+        max_llm_tokens: Global cap on LLM tokens for the whole run (default: unlimited)
+        time_budget_s: Wall-clock budget in seconds for the whole run (default: unlimited)
+        escalation_model: Stronger model for fields the cheap model answers below threshold
+        few_shot: If True, seed estimates with verified values of the most similar filled rows
+
+    With any budget set, rows are filled in expected-value order (most empty
+    safety-critical fields first) and fall back to estimation once the budget is spent.
 
     Returns:
         List of (possibly filled) HMISGasRecord
@@ -42,12 +68,106 @@ def run_pipeline(
             export_records_to_excel(records, output_path, original_path=path)
         return records
 
-    filled: list[HMISGasRecord] = []
-    for idx, record in enumerate(records, 1):
-        print(f"Processing row {idx}/{len(records)}: {record.chemical_name or record.sub_system_filter_formula}")
-        updated = fill_record_with_graph(record)
-        filled.append(updated)
+    corpus = None
+    if sds_corpus_dir is not None:
+        corpus_dir = Path(sds_corpus_dir)
+        corpus = SDSCorpus(corpus_dir, index_path=corpus_dir / ".sds_index.json")
+
+    budget = None
+    if max_search_calls is not None or max_llm_tokens is not None or time_budget_s is not None:
+        budget = RunBudget(
+            max_search_calls=max_search_calls,
+            max_llm_tokens=max_llm_tokens,
+            time_budget_s=time_budget_s,
+        )
+
+    neighbors = NeighborIndex.from_records(records) if few_shot else None
+
+    order = prioritize_records(records) if budget else list(range(len(records)))
+    weights = [row_weight(r) for r in records]
+    remaining_weight = sum(weights)
+
+    filled: list[HMISGasRecord] = list(records)
+    provenance: dict[int, dict[str, dict]] = {}
+    for n, idx in enumerate(order, 1):
+        record = records[idx]
+        print(f"Processing row {idx + 1} ({n}/{len(records)}): {record.chemical_name or record.sub_system_filter_formula}")
+        row_budget = budget.for_row(weights[idx], remaining_weight, len(order) - n + 1) if budget else None
+        remaining_weight -= weights[idx]
+        filled[idx], provenance[idx] = fill_record_with_provenance(
+            record,
+            corpus=corpus,
+            budget=row_budget,
+            escalation_model=escalation_model,
+            neighbors=neighbors,
+        )
+
+    if validate:
+        filled = normalize_units(filled)
+        # Only cells the agent filled are labeled or re-filled; source values are left alone
+        filled_cells = {i: set(p) for i, p in provenance.items()}
+        filled = label_unparsed(filled, filled_cells)
+        issues = validate_records(filled, filled_cells=filled_cells)
+        for n, (idx, fields) in enumerate(issues.items()):
+            record = filled[idx]
+            print(f"Re-filling {len(fields)} flagged cells for row {idx + 1}: {record.chemical_name or record.sub_system_filter_formula}")
+            row_budget = budget.for_row(1.0, float(len(issues) - n), len(issues) - n) if budget else None
+            filled[idx], refilled = fill_record_with_provenance(
+                record,
+                pending_fields=list(fields),
+                prior_provenance=provenance[idx],
+                corpus=corpus,
+                budget=row_budget,
+                escalation_model=escalation_model,
+                neighbors=neighbors,
+            )
+            provenance[idx] = {
+                **{f: p for f, p in provenance[idx].items() if f not in fields},
+                **refilled,
+            }
+
+    if budget:
+        print(f"Budget used: {budget.summary()}")
+    print(f"Prompt tokens: {PROMPT_STATS.summary()}")
+    print(f"Model cascade: {CASCADE_STATS.summary()}")
+    print(f"Content dedup: {CONTENT_STORE.summary()}")
+    print(f"Latency:\n{LATENCY.summary()}")
 
     if output_path:
         export_records_to_excel(filled, output_path, original_path=path)
     return filled
+
+
+def run_column_pipeline(
+    input_path: str | Path,
+    output_path: str | Path | None = None,
+    *,
+    columns: list[str | int],
+    sheet_name: str | None = None,
+    max_rows: int | None = None,
+    **column_kwargs,
+) -> tuple[list[HMISGasRecord], dict[int, dict[str, dict]]]:
+    """
+    Column-wise counterpart of `run_pipeline`: fill each of `columns` (field names or
+    `HMIS_COLUMN_SPEC` indices) across all rows missing it, then optionally export.
+    Extra kwargs go to `fill_column`.
+
+    Returns:
+        (records, provenance by row index)
+    """
+    path = Path(input_path)
+    records = load_hmis_excel(path, sheet_name=sheet_name)
+    if max_rows is not None:
+        records = records[:max_rows]
+
+    provenance: dict[int, dict[str, dict]] = {}
+    for column in columns:
+        print(f"Filling column {column}")
+        records, provenance = fill_column(records, column, provenance=provenance, **column_kwargs)
+
+    print(f"Prompt tokens: {PROMPT_STATS.summary()}")
+    print(f"Latency:\n{LATENCY.summary()}")
+
+    if output_path:
+        export_records_to_excel(records, output_path, original_path=path)
+    return records, provenance
@@ -1,4 +1,11 @@
-"""Prompts for LLM extraction."""
+"""
+Prompts for LLM extraction.
+
+Layout is cache-friendly: everything static (rules, both extraction modes and the full
+field catalog) lives in `EXTRACTION_PREFIX`, a byte-identical system message shared by
+every call, so the provider's automatic prompt caching can reuse it. Only the
+per-chemical part built by `build_extraction_prompt` changes between calls.
+"""
 
 from gas_agent.schema import FIELD_TO_DESCRIPTION
 
@@ -20,30 +27,105 @@ Rules:
 - Extract values found in search results with appropriate confidence
 - Provide reasonable estimates when direct data unavailable
 - Keep values concise (word/phrase/number+unit)
-- ALWAYS provide a value, even if confidence is low"""
+- ALWAYS provide a value, even if confidence is low
+- Only return fields listed under "Fields to fill" in the request"""
 
+EXTRACTION_MODES = """Modes:
+- EXTRACT: Fill the requested fields from the search results. Prefer values stated
+  in the results; use source_url of the result you read.
+- ESTIMATE: These are remaining unfilled fields. You MUST provide a value for each field.
+  - If found in search results: extract with appropriate confidence
+  - If not found: provide your best estimate based on chemical properties/knowledge
+  - Mark uncertain estimates with lower confidence (0.1-0.4)
+  - If "Similar chemicals" are listed, use their verified values as analogues
+  - NEVER leave a field without a value"""
 
-def build_extraction_prompt(chemical: str, fields: list[str], context: str, is_general: bool = False) -> str:
-    """Build user prompt for LLM extraction."""
-    field_descs = "\n".join([f"- {f}: {FIELD_TO_DESCRIPTION.get(f, f)}" for f in fields[:30]])
-    
-    if is_general:
-        instruction = """IMPORTANT: These are remaining unfilled fields. You MUST provide a value for each field.
-- If found in search results: extract with appropriate confidence
-- If not found: provide your best estimate based on chemical properties/knowledge
-- Mark uncertain estimates with lower confidence (0.1-0.4)
-- NEVER leave a field without a value
+VALUE_CONVENTIONS = """Value conventions:
+- Temperatures in °C, pressures in bar, viscosity in cP, specific gravity relative to H2O
+- Give numbers without thousands separators; add the unit only if it differs from the column unit
+- GHS pictogram columns (ghs01-ghs09): "Y" if the pictogram applies, "N" otherwise
+- Hazardous statement: list H-codes with short phrases, e.g. "H220, H280"
+- CAS numbers in the form 1234-56-7
+- Physical form: "CG" (compressed gas) or "LG" (liquefied gas)"""
 
-Fields to fill:"""
-    else:
-        instruction = "Fields to extract:"
-    
-    return f"""Chemical: {chemical}
+EXTRACTION_EXAMPLE = """Example:
+Request: Mode: EXTRACT / Fields to fill: cas_number, boiling_point_c, ghs04_compressed, hazardous_statement / Chemical: Argon
+Response:
+{"updates": [
+  {"field": "cas_number", "value": "7440-37-1", "confidence": 0.95, "source_url": "https://www.airgas.com/msds/001004.pdf"},
+  {"field": "boiling_point_c", "value": "-185.8", "confidence": 0.9, "source_url": "https://www.airgas.com/msds/001004.pdf"},
+  {"field": "ghs04_compressed", "value": "Y", "confidence": 0.9, "source_url": "https://www.airgas.com/msds/001004.pdf"},
+  {"field": "hazardous_statement", "value": "H280: Contains gas under pressure; may explode if heated", "confidence": 0.9, "source_url": "https://www.airgas.com/msds/001004.pdf"}
+]}"""
 
-{instruction}
-{field_descs}
+FIELD_CATALOG = "Field catalog (field: description):\n" + "\n".join(
+    f"- {name}: {desc}" for name, desc in FIELD_TO_DESCRIPTION.items()
+)
 
-Search results:
+# Static, byte-identical prefix sent as the system message on every extraction call
+EXTRACTION_PREFIX = "\n\n".join([
+    EXTRACTION_SYSTEM_PROMPT,
+    EXTRACTION_MODES,
+    VALUE_CONVENTIONS,
+    EXTRACTION_EXAMPLE,
+    FIELD_CATALOG,
+])
+
+
+def build_extraction_prompt(
+    chemical: str,
+    fields: list[str],
+    context: str,
+    is_general: bool = False,
+    examples: str = "",
+) -> str:
+    """
+    Build the per-call user prompt; descriptions come from the catalog in the prefix.
+    `examples` (from `NeighborIndex.few_shot_context`) lists similar chemicals' values.
+    """
+    mode = "ESTIMATE" if is_general else "EXTRACT"
+    field_names = ", ".join(fields)
+    similar = f"Similar chemicals (verified values):\n{examples}\n\n" if examples else ""
+
+    return f"""Mode: {mode}
+Fields to fill: {field_names}
+
+Chemical: {chemical}
+
+{similar}Search results:
 {context}
 
 Extract or estimate ALL field values. Output JSON only."""
+
+
+COLUMN_SYSTEM_PROMPT = """You are an expert in chemical safety and HMIS data extraction.
+
+Fill ONE property for a numbered list of chemicals from search results (reference
+tables, comparison pages, SDS excerpts). Output ONLY valid JSON.
+
+Format:
+{"values": [{"row": 1, "value": "extracted value", "confidence": 0.0-1.0, "source_url": "url or null"}]}
+
+Rules:
+- One entry per listed chemical, using its number as "row"
+- Use the value stated for that exact chemical; do not copy values between chemicals
+- If a chemical's value is not in the results, give your best estimate with confidence 0.1-0.4
+- Keep values concise (word/phrase/number+unit)"""
+
+# Static system message for column-mode calls
+COLUMN_PREFIX = "\n\n".join([COLUMN_SYSTEM_PROMPT, VALUE_CONVENTIONS])
+
+
+def build_column_prompt(field: str, chemicals: list[str], context: str) -> str:
+    """Per-call prompt for one column across a numbered group of chemicals."""
+    listing = "\n".join(f"{n}. {name}" for n, name in enumerate(chemicals, 1))
+
+    return f"""Property: {field} ({FIELD_TO_DESCRIPTION.get(field, field)})
+
+Chemicals:
+{listing}
+
+Search results:
+{context}
+
+Give the property for ALL listed chemicals. Output JSON only."""
@@ -45,40 +45,55 @@ SEARCH_TIERS = [
 ]
 
 
+# Field groups (also used to shard estimation prompts into coherent batches)
+PHYSICAL_PROPERTY_FIELDS = {
+    "cas_number", "boiling_point_c", "freeze_melt_point_c", "flash_point",
+    "vapor_pressure_bar", "viscosity_cp", "specific_gravity", "appearance",
+    "physical_form", "ph_value"
+}
+
+SAFETY_FIELDS = {
+    "hazardous_chemical", "hazard_class", "flammability", "reactivity",
+    "special", "ghs05_corrosive", "ghs08_harmful_health", "ghs07_harmful",
+    "ghs04_compressed", "ghs09_environmental", "ghs03_oxidizing",
+    "ghs06_toxic", "ghs02_flammable", "ghs01_explosive",
+    "hazardous_statement", "fire_extinguishing_media"
+}
+
+FACILITY_FIELDS = {
+    "exhausted_enclosure", "coaxal_line_dc", "gas_detection_gds",
+    "lss_shutdown", "design_specialities", "exhaust_dispense",
+    "exhaust_distribution", "purge_vent", "purge_panel_dispense",
+    "purge_panel_distribution", "gb_fire_code_class"
+}
+
+
+def get_field_category(field_name: str) -> str:
+    """Return "physical", "safety", "facility" or "general" for a schema field."""
+    if field_name in PHYSICAL_PROPERTY_FIELDS:
+        return "physical"
+    if field_name in SAFETY_FIELDS:
+        return "safety"
+    if field_name in FACILITY_FIELDS:
+        return "facility"
+    return "general"
+
+
 def get_domains_for_field(field_name: str) -> list[str] | None:
     """
     Return prioritized domain list based on field type.
     Returns None for open web search.
     """
-    # Physical/chemical properties → suppliers (they have detailed SDS)
-    physical_properties = {
-        "cas_number", "boiling_point_c", "freeze_melt_point_c", "flash_point",
-        "vapor_pressure_bar", "viscosity_cp", "specific_gravity", "appearance",
-        "physical_form", "ph_value"
-    }
+    category = get_field_category(field_name)
     
-    # Safety/hazard classifications → standards organizations
-    safety_fields = {
-        "hazardous_chemical", "hazard_class", "flammability", "reactivity",
-        "special", "ghs05_corrosive", "ghs08_harmful_health", "ghs07_harmful",
-        "ghs04_compressed", "ghs09_environmental", "ghs03_oxidizing",
-        "ghs06_toxic", "ghs02_flammable", "ghs01_explosive",
-        "hazardous_statement", "fire_extinguishing_media"
-    }
-    
-    # Building/facility codes → regulatory bodies
-    facility_fields = {
-        "exhausted_enclosure", "coaxal_line_dc", "gas_detection_gds",
-        "lss_shutdown", "design_specialities", "exhaust_dispense",
-        "exhaust_distribution", "purge_vent", "purge_panel_dispense",
-        "purge_panel_distribution", "gb_fire_code_class"
-    }
-    
-    if field_name in physical_properties:
+    # Physical/chemical properties → suppliers (they have detailed SDS)
+    if category == "physical":
         return GAS_SUPPLIERS + SAFETY_STANDARDS
-    elif field_name in safety_fields:
+    # Safety/hazard classifications → standards organizations
+    elif category == "safety":
         return SAFETY_STANDARDS + GAS_SUPPLIERS
-    elif field_name in facility_fields:
+    # Building/facility codes → regulatory bodies
+    elif category == "facility":
         return REGULATORY_BODIES + GAS_SUPPLIERS
     else:
         # Generic: try all trusted sources
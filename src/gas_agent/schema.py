@@ -61,6 +61,8 @@ HMIS_COLUMN_SPEC = [
 
 COLUMN_INDEX_TO_FIELD: dict[int, str] = {idx: name for idx, name, _ in HMIS_COLUMN_SPEC}
 FIELD_TO_DESCRIPTION: dict[str, str] = {name: desc for _, name, desc in HMIS_COLUMN_SPEC}
+FIELD_TO_COLUMN_INDEX: dict[str, int] = {name: idx for idx, name, _ in HMIS_COLUMN_SPEC}
+NUM_COLUMNS = max(COLUMN_INDEX_TO_FIELD) + 1
 
 
 class HMISGasRecord(BaseModel):
@@ -117,19 +119,106 @@ class HMISGasRecord(BaseModel):
     col_46: Optional[str] = Field(None, description="Reserved column")
 
 
-def get_empty_field_names(record: HMISGasRecord) -> list[str]:
+def _is_blank(value) -> bool:
+    return value is None or (isinstance(value, str) and not value.strip())
+
+
+def get_empty_field_names(record: "HMISGasRecord | CompactRecord") -> list[str]:
     """Return field names whose value is None or empty string."""
-    return [
-        k
-        for k, v in record.model_dump().items()
-        if v is None or (isinstance(v, str) and not v.strip())
-    ]
+    if isinstance(record, CompactRecord):
+        return record.empty_fields()
+    return [k for k in HMISGasRecord.model_fields if _is_blank(getattr(record, k))]
 
 
-def get_filled_field_names(record: HMISGasRecord) -> list[str]:
+def get_filled_field_names(record: "HMISGasRecord | CompactRecord") -> list[str]:
     """Return field names that have a non-empty value."""
-    return [
-        k
-        for k, v in record.model_dump().items()
-        if v is not None and (not isinstance(v, str) or v.strip())
-    ]
+    if isinstance(record, CompactRecord):
+        return record.filled_fields()
+    return [k for k in HMISGasRecord.model_fields if not _is_blank(getattr(record, k))]
+
+
+class CompactRecord:
+    """
+    Fixed-width, slotted record used inside the graph.
+
+    Values live in a list indexed by `HMIS_COLUMN_SPEC` column; `filled` and `pending`
+    are bitmasks over the same columns. Updates touch one slot and two bits instead of
+    dumping and re-validating a whole `HMISGasRecord`. Convert with `from_record` /
+    `to_record` at the graph boundary.
+    """
+
+    __slots__ = ("values", "filled", "pending")
+
+    def __init__(self, values: list[str | None], filled: int = 0, pending: int = 0):
+        self.values = values
+        self.filled = filled
+        self.pending = pending
+
+    @classmethod
+    def from_record(cls, record: HMISGasRecord, pending: list[str] | None = None) -> "CompactRecord":
+        values: list[str | None] = [None] * NUM_COLUMNS
+        filled = 0
+        for idx, field in COLUMN_INDEX_TO_FIELD.items():
+            value = getattr(record, field)
+            if not _is_blank(value):
+                values[idx] = value
+                filled |= 1 << idx
+        compact = cls(values, filled)
+        for field in pending or ():
+            compact.mark_pending(field)
+        return compact
+
+    def to_record(self) -> HMISGasRecord:
+        return HMISGasRecord(**{field: self.values[idx] for idx, field in COLUMN_INDEX_TO_FIELD.items()})
+
+    def copy(self) -> "CompactRecord":
+        return CompactRecord(self.values.copy(), self.filled, self.pending)
+
+    def get(self, field: str) -> str | None:
+        return self.values[FIELD_TO_COLUMN_INDEX[field]]
+
+    def set(self, field: str, value: str | None) -> None:
+        """Set a value; filled bit follows the value, pending bit is cleared."""
+        idx = FIELD_TO_COLUMN_INDEX[field]
+        bit = 1 << idx
+        if _is_blank(value):
+            self.values[idx] = None
+            self.filled &= ~bit
+        else:
+            self.values[idx] = value
+            self.filled |= bit
+        self.pending &= ~bit
+
+    def mark_pending(self, field: str) -> None:
+        """Clear a cell and flag it for (re-)filling."""
+        idx = FIELD_TO_COLUMN_INDEX[field]
+        self.values[idx] = None
+        self.filled &= ~(1 << idx)
+        self.pending |= 1 << idx
+
+    def is_pending(self, field: str) -> bool:
+        idx = FIELD_TO_COLUMN_INDEX.get(field)
+        return idx is not None and bool(self.pending >> idx & 1)
+
+    def is_filled(self, field: str) -> bool:
+        return bool(self.filled >> FIELD_TO_COLUMN_INDEX[field] & 1)
+
+    def _fields(self, mask: int) -> list[str]:
+        return [COLUMN_INDEX_TO_FIELD[i] for i in range(NUM_COLUMNS) if mask >> i & 1]
+
+    def filled_fields(self) -> list[str]:
+        return self._fields(self.filled)
+
+    def empty_fields(self) -> list[str]:
+        return self._fields(~self.filled & ((1 << NUM_COLUMNS) - 1))
+
+    def pending_fields(self) -> list[str]:
+        return self._fields(self.pending)
+
+    def __getattr__(self, field: str):
+        # Attribute access like HMISGasRecord (record.chemical_name). Unknown names fail
+        # before touching `values`, which is unset while copy/pickle rebuild the object.
+        idx = FIELD_TO_COLUMN_INDEX.get(field)
+        if idx is None:
+            raise AttributeError(field)
+        return self.values[idx]
@@ -0,0 +1,283 @@
+"""
+Long-running fill server: one warm process for on-demand single-chemical fills.
+
+    python -m gas_agent.main --serve                  # http://127.0.0.1:8765
+    GAS_AGENT_SOCKET=/tmp/gas_agent.sock python -m gas_agent.main --serve
+
+The compiled graph, the LLM/Tavily clients (and their HTTP connection pools), the local
+SDS corpus and the process-wide caches (`CONTENT_STORE`, prompt/latency stats) are
+created once and shared by every request.
+
+    POST /fill    {"chemical_name": "Silane"}  or  {"record": {...HMISGasRecord...}}
+                  optional "pending_fields": [...] to re-fill only those fields
+                  → {"record": {...}, "provenance": {field: {value, confidence,
+                     source_url, tier}}, "coalesced": bool, "elapsed_s": float}
+    GET  /health  → {"status": "ok"}
+    GET  /stats   → prompt cache, cascade, content store and latency summaries
+
+Concurrent requests for the same record are coalesced into one graph run; every
+waiting caller gets the same result.
+"""
+
+import json
+import logging
+import os
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from pydantic import ValidationError
+
+from gas_agent.schema import HMISGasRecord
+from gas_agent.config import DEFAULT_CONFIG
+from gas_agent.content_store import CONTENT_STORE, chemical_key
+from gas_agent.cascade import CASCADE_STATS
+from gas_agent.latency import LATENCY, make_tavily_search
+from gas_agent.tokens import PROMPT_STATS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 1_000_000
+
+
+class FillService:
+    """Warm clients + request coalescing around `fill_record_with_provenance`."""
+
+    def __init__(
+        self,
+        *,
+        llm=None,
+        search_tool=None,
+        escalation_llm=None,
+        sds_corpus_dir: str | Path | None = None,
+        **fill_kwargs,
+    ):
+        from langchain_openai import ChatOpenAI
+
+        from gas_agent.graph import get_search_graph
+
+        model = fill_kwargs.get("model", DEFAULT_CONFIG["model"])
+        escalation_model = fill_kwargs.get("escalation_model", DEFAULT_CONFIG["escalation_model"])
+        llm_timeout_s = fill_kwargs.get("llm_timeout_s", DEFAULT_CONFIG["llm_timeout_s"])
+        max_results = fill_kwargs.get("max_results_per_search", 5)
+
+        self.llm = llm or ChatOpenAI(model=model, temperature=0, request_timeout=llm_timeout_s)
+        if escalation_llm is None and escalation_model:
+            escalation_llm = ChatOpenAI(model=escalation_model, temperature=0, request_timeout=llm_timeout_s)
+        self.escalation_llm = escalation_llm
+        search_timeout_s = fill_kwargs.get("search_timeout_s", DEFAULT_CONFIG["search_timeout_s"])
+        self.search_tool = search_tool or make_tavily_search(max_results, search_timeout_s)
+
+        self.corpus = None
+        if sds_corpus_dir is not None:
+            from gas_agent.corpus import SDSCorpus
+
+            self.corpus = SDSCorpus(sds_corpus_dir, index_path=Path(sds_corpus_dir) / ".sds_index.json")
+
+        if "neighbors" not in fill_kwargs:
+            from gas_agent.neighbors import NeighborIndex
+
+            fill_kwargs["neighbors"] = NeighborIndex()  # Grows with every served fill
+        self.fill_kwargs = fill_kwargs
+        get_search_graph()  # Compile now, not on the first request
+
+        self._inflight: dict[tuple, Future] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.coalesced = 0
+        self.started_at = time.time()
+
+    @staticmethod
+    def _key(record: HMISGasRecord, pending_fields: list[str] | None) -> tuple:
+        name = chemical_key(record.chemical_name or record.sub_system_filter_formula or "")
+        return name, record.model_dump_json(exclude_none=True), tuple(pending_fields or ())
+
+    def fill(self, record: HMISGasRecord, pending_fields: list[str] | None = None) -> tuple[HMISGasRecord, dict, bool]:
+        """
+        Fill one record. Returns (record, provenance, coalesced), where `coalesced` is
+        True if the result came from an identical request already in flight.
+        """
+        from gas_agent.graph_agent import fill_record_with_provenance
+
+        key = self._key(record, pending_fields)
+        with self._lock:
+            self.requests += 1
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            logger.info(f"🔗 Coalesced request for {key[0] or 'unnamed record'}")
+            filled, provenance = future.result()
+            return filled, provenance, True
+
+        try:
+            result = fill_record_with_provenance(
+                record,
+                llm=self.llm,
+                search_tool=self.search_tool,
+                escalation_llm=self.escalation_llm,
+                corpus=self.corpus,
+                content_store=CONTENT_STORE,
+                pending_fields=pending_fields,
+                **self.fill_kwargs,
+            )
+            future.set_result(result)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        return result[0], result[1], False
+
+    def stats(self) -> dict:
+        with self._lock:
+            inflight = len(self._inflight)
+        return {
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "inflight": inflight,
+            "prompt_cache": PROMPT_STATS.summary(),
+            "cascade": CASCADE_STATS.summary(),
+            "content_store": CONTENT_STORE.summary(),
+            "latency": LATENCY.snapshot(),
+        }
+
+
+def _parse_fill_request(body: dict) -> tuple[HMISGasRecord, list[str] | None]:
+    """Body → (record, pending_fields). Raises ValueError on bad input."""
+    if not isinstance(body, dict):
+        raise ValueError("request body must be a JSON object")
+    if isinstance(body.get("record"), dict):
+        record = HMISGasRecord(**body["record"])
+    elif isinstance(body.get("chemical_name"), str) and body["chemical_name"].strip():
+        record = HMISGasRecord(chemical_name=body["chemical_name"].strip())
+    else:
+        raise ValueError('expected "record" (object) or "chemical_name" (string)')
+
+    pending_fields = body.get("pending_fields")
+    if pending_fields is not None:
+        if not isinstance(pending_fields, list) or not all(f in HMISGasRecord.model_fields for f in pending_fields):
+            raise ValueError('"pending_fields" must be a list of HMISGasRecord field names')
+    return record, pending_fields
+
+
+class FillRequestHandler(BaseHTTPRequestHandler):
+    """JSON API over the server's shared `FillService`."""
+
+    server_version = "gas-agent"
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/stats":
+            self._send_json(200, self.server.service.stats())
+        else:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self) -> None:
+        if self.path != "/fill":
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self._send_json(413, {"error": "request body too large"})
+            return
+        try:
+            record, pending_fields = _parse_fill_request(json.loads(self.rfile.read(length) or b"{}"))
+        except (ValueError, ValidationError) as e:  # JSONDecodeError is a ValueError
+            self._send_json(400, {"error": str(e)})
+            return
+
+        started = time.monotonic()
+        try:
+            filled, provenance, coalesced = self.server.service.fill(record, pending_fields)
+        except Exception as e:
+            logger.warning(f"✗ Fill failed for {record.chemical_name}: {e}")
+            self._send_json(500, {"error": repr(e)})
+            return
+
+        self._send_json(200, {
+            "record": filled.model_dump(),
+            "provenance": provenance,
+            "coalesced": coalesced,
+            "elapsed_s": round(time.monotonic() - started, 3),
+        })
+
+    def address_string(self) -> str:
+        # Unix-socket peers have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) and self.client_address else "unix"
+
+    def log_message(self, format: str, *args) -> None:
+        logger.info(f"{self.address_string()} {format % args}")
+
+
+class _ThreadingUnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self) -> None:
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = str(self.server_address), 0
+
+
+def make_server(
+    service: FillService,
+    *,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket_path: str | Path | None = None,
+):
+    """HTTP server on host:port, or on a Unix socket if `socket_path` is given."""
+    if socket_path is not None:
+        socket_path = str(socket_path)
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # Stale socket from a previous run
+        server = _ThreadingUnixHTTPServer(socket_path, FillRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), FillRequestHandler)
+        server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def serve(
+    *,
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    socket_path: str | Path | None = None,
+    **service_kwargs,
+) -> None:
+    """Start a `FillService` and serve requests until interrupted."""
+    service = FillService(**service_kwargs)
+    server = make_server(service, host=host, port=port, socket_path=socket_path)
+    where = socket_path or f"http://{host}:{port}"
+    print(f"🛰️  Gas agent server listening on {where}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if socket_path is not None and os.path.exists(socket_path):
+            os.unlink(socket_path)
+        logger.info(f"✓ Server stopped after {service.requests} requests ({service.coalesced} coalesced)")
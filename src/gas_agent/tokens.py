@@ -0,0 +1,117 @@
+"""
+Local token counting and prompt-cache accounting.
+
+OpenAI caches the longest previously seen prompt prefix once it reaches 1024 tokens,
+in 128-token increments. With the static `EXTRACTION_PREFIX` sent first on every call,
+we can estimate locally how much of each call's input is served from cache, and compare
+it with the provider-reported `cached_tokens` when the response carries usage data.
+"""
+
+import logging
+import threading
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_MIN_TOKENS = 1024
+CACHE_INCREMENT = 128
+DEFAULT_MODEL = "gpt-4o-mini"
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    """tiktoken encoding for `model`, or None if tiktoken or its BPE files are unavailable."""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        try:
+            return tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            logger.warning(f"tiktoken unavailable, approximating token counts: {e}")
+            return None
+
+
+@lru_cache(maxsize=256)
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    """Count tokens locally; falls back to ~4 chars/token without tiktoken."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+
+def cacheable_tokens(prefix_tokens: int) -> int:
+    """Tokens of a prefix the provider can serve from cache (0 below the minimum)."""
+    if prefix_tokens < CACHE_MIN_TOKENS:
+        return 0
+    return CACHE_MIN_TOKENS + (prefix_tokens - CACHE_MIN_TOKENS) // CACHE_INCREMENT * CACHE_INCREMENT
+
+
+def reported_cached_tokens(response) -> int | None:
+    """Provider-reported cached input tokens, if the response carries usage data."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    if "cache_read" in details:
+        return int(details["cache_read"] or 0)
+    token_usage = (getattr(response, "response_metadata", None) or {}).get("token_usage") or {}
+    prompt_details = token_usage.get("prompt_tokens_details") or {}
+    if "cached_tokens" in prompt_details:
+        return int(prompt_details["cached_tokens"] or 0)
+    return None
+
+
+class PromptCacheStats:
+    """Thread-safe per-run tally of cached vs uncached input tokens."""
+
+    def __init__(self, model: str = DEFAULT_MODEL):
+        self.model = model
+        self.calls = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.reported_cached = 0
+        self.reported_calls = 0
+        self._seen_prefixes: set[int] = set()
+        self._lock = threading.Lock()
+
+    def record(self, prefix: str, suffix: str, response=None) -> dict:
+        """
+        Account for one call made as prefix (system) + suffix (user).
+        The first call with a given prefix is a cache miss; later ones hit.
+        """
+        prefix_tokens = count_tokens(prefix, self.model)
+        suffix_tokens = count_tokens(suffix, self.model)
+        total = prefix_tokens + suffix_tokens
+        reported = reported_cached_tokens(response) if response is not None else None
+
+        with self._lock:
+            key = hash(prefix)
+            cached = cacheable_tokens(prefix_tokens) if key in self._seen_prefixes else 0
+            self._seen_prefixes.add(key)
+            self.calls += 1
+            self.input_tokens += total
+            self.cached_tokens += cached
+            if reported is not None:
+                self.reported_cached += reported
+                self.reported_calls += 1
+
+        logger.debug(f"🧮 {total} input tokens ({cached} cached est., {total - cached} uncached)")
+        return {"input_tokens": total, "cached_tokens": cached, "reported_cached_tokens": reported}
+
+    def summary(self) -> str:
+        uncached = self.input_tokens - self.cached_tokens
+        rate = self.cached_tokens / self.input_tokens if self.input_tokens else 0.0
+        text = (
+            f"{self.calls} LLM calls, {self.input_tokens} input tokens "
+            f"({self.cached_tokens} cached est. = {rate:.0%}, {uncached} uncached)"
+        )
+        if self.reported_calls:
+            text += f", provider reported {self.reported_cached} cached"
+        return text
+
+
+# Process-wide stats for extraction calls
+PROMPT_STATS = PromptCacheStats()
@@ -3,6 +3,8 @@
 import json
 import logging
 
+from gas_agent.references import get_field_category
+
 logger = logging.getLogger(__name__)
 
 
@@ -44,6 +46,20 @@ def build_context_from_results(results: list, max_results: int, max_chars: int)
     return "\n\n---\n\n".join(context_parts)[:12000]
 
 
+def build_general_context(results: list) -> str:
+    """Short context for the estimation pass (use what's available, even if empty)."""
+    context_parts = []
+    for r in (results or [])[:5]:
+        if isinstance(r, dict):
+            content = r.get("content", "")[:800]
+            if content:
+                context_parts.append(content)
+    
+    if not context_parts:
+        return "No search results available. Provide estimates based on chemical knowledge."
+    return "\n\n".join(context_parts)[:3000]
+
+
 def should_update_field(field: str, new_confidence: float, filled_fields: dict, config: dict) -> bool:
     """Determine if a field should be updated based on confidence."""
     if field not in filled_fields:
@@ -53,3 +69,79 @@ def should_update_field(field: str, new_confidence: float, filled_fields: dict,
     # Has value - only update if significantly better
     old_confidence = filled_fields[field].get("confidence", 0.0)
     return new_confidence >= old_confidence + config["overwrite_delta"]
+
+
+def apply_tier_updates(current_record, new_record, filled: dict, updates: list, tier: str, config: dict) -> int:
+    """
+    Apply tier extraction updates to `new_record` / `filled` (provenance) in place.
+    Only fields still pending in `current_record` are considered. Returns the number applied.
+    """
+    filled_count = 0
+    for upd in updates:
+        if not isinstance(upd, dict):
+            continue
+        field = upd.get("field")
+        value = (upd.get("value") or "").strip()
+        confidence = upd.get("confidence", 0.5)
+        source_url = upd.get("source_url")
+        
+        if not field or not value or "UNKNOWN" in value.upper() or not current_record.is_pending(field):
+            continue
+        
+        if should_update_field(field, confidence, filled, config):
+            new_record.set(field, value)
+            filled[field] = {
+                "value": value,
+                "confidence": confidence,
+                "source_url": source_url,
+                "tier": tier
+            }
+            filled_count += 1
+    return filled_count
+
+
+def apply_general_updates(current_record, new_record, filled: dict, updates: list, has_results: bool) -> int:
+    """
+    Apply estimation-pass updates: any value is accepted for still-pending fields (final
+    pass), labeled "(review required)" when confidence is low or there were no results.
+    """
+    filled_count = 0
+    for upd in updates:
+        if not isinstance(upd, dict):
+            continue
+        field = upd.get("field")
+        value = (upd.get("value") or "").strip()
+        confidence = upd.get("confidence", 0.2)
+        
+        if current_record.is_pending(field) and value and value.upper() not in ["NULL", "NONE", ""]:
+            if confidence < 0.4 or not has_results:
+                labeled_value = f"{value} (review required)"
+            else:
+                labeled_value = value
+            
+            new_record.set(field, labeled_value)
+            filled[field] = {
+                "value": labeled_value,
+                "confidence": confidence,
+                "source_url": None,
+                "tier": "general"
+            }
+            filled_count += 1
+    return filled_count
+
+
+def shard_fields(fields: list[str], max_shard_size: int) -> list[list[str]]:
+    """
+    Split fields into category-coherent shards (physical / safety / facility / general),
+    each at most `max_shard_size` long. Order within a category is preserved; no field is dropped.
+    """
+    groups: dict[str, list[str]] = {}
+    for field in fields:
+        groups.setdefault(get_field_category(field), []).append(field)
+    
+    shards: list[list[str]] = []
+    size = max(1, max_shard_size)
+    for group in groups.values():
+        for i in range(0, len(group), size):
+            shards.append(group[i:i + size])
+    return shards
@@ -0,0 +1,341 @@
+"""
+Table-wide consistency validation for filled HMIS records.
+
+Numeric columns are parsed once into NumPy arrays across all rows, normalized to
+the schema units (°C, bar, cP) and checked in bulk. Implausible values and cross-field
+conflicts are returned per row so they can be fed straight back as `pending_fields`
+for a targeted re-fill.
+
+A numeric cell only counts as parsed when the whole cell reads `<number> [unit]`,
+optionally followed by a parenthetical note ("(-258.7 °F)", "(air = 1)") and a
+condition ("@ 20 °C", "at 1 atm"). Anything else (thousands separators, "1.2 x 10^3",
+prose) is never rewritten; `label_unparsed` marks it "(review required)" instead of
+blanking it for a re-fill.
+"""
+
+import logging
+import re
+
+import numpy as np
+
+from gas_agent.schema import HMISGasRecord
+
+logger = logging.getLogger(__name__)
+
+
+NUMERIC_FIELDS = [
+    "vapor_pressure_bar",
+    "boiling_point_c",
+    "freeze_melt_point_c",
+    "specific_gravity",
+    "viscosity_cp",
+]
+
+# Unit token → (multiplier, offset) into the schema unit: value * mult + offset
+PRESSURE_UNITS = {
+    "bar": (1.0, 0.0),
+    "mbar": (1e-3, 0.0),
+    "kpa": (1e-2, 0.0),
+    "mpa": (10.0, 0.0),
+    "pa": (1e-5, 0.0),
+    "psi": (0.0689476, 0.0),
+    "psia": (0.0689476, 0.0),
+    "psig": (0.0689476, 1.01325),
+    "atm": (1.01325, 0.0),
+    "mmhg": (1.33322e-3, 0.0),
+    "torr": (1.33322e-3, 0.0),
+}
+
+TEMPERATURE_UNITS = {
+    "c": (1.0, 0.0),
+    "f": (5.0 / 9.0, -32.0 * 5.0 / 9.0),
+    "k": (1.0, -273.15),
+}
+
+VISCOSITY_UNITS = {
+    "cp": (1.0, 0.0),
+    "mpa·s": (1.0, 0.0),
+    "mpas": (1.0, 0.0),
+    "µpa·s": (1e-3, 0.0),
+    "upa·s": (1e-3, 0.0),
+    "µpas": (1e-3, 0.0),
+    "upas": (1e-3, 0.0),
+    "pa·s": (1e3, 0.0),
+    "pas": (1e3, 0.0),
+}
+
+FIELD_UNITS = {
+    "vapor_pressure_bar": PRESSURE_UNITS,
+    "boiling_point_c": TEMPERATURE_UNITS,
+    "freeze_melt_point_c": TEMPERATURE_UNITS,
+    "viscosity_cp": VISCOSITY_UNITS,
+    "specific_gravity": {},
+}
+
+# Physical plausibility bounds in schema units (inclusive)
+PLAUSIBLE_RANGES = {
+    "vapor_pressure_bar": (0.0, 1000.0),
+    "boiling_point_c": (-273.15, 3000.0),
+    "freeze_melt_point_c": (-273.15, 3000.0),
+    "specific_gravity": (1e-4, 25.0),
+    "viscosity_cp": (1e-4, 1e6),
+}
+
+# GHS pictogram column → H-statement code prefixes that imply it
+GHS_HAZARD_CODES = {
+    "ghs01_explosive": ("H200", "H201", "H202", "H203", "H204", "H205", "H240", "H241"),
+    "ghs02_flammable": ("H220", "H221", "H222", "H223", "H224", "H225", "H226", "H228",
+                        "H230", "H231", "H232", "H241", "H242", "H250", "H251", "H252",
+                        "H260", "H261"),
+    "ghs03_oxidizing": ("H270", "H271", "H272"),
+    "ghs04_compressed": ("H280", "H281"),
+    "ghs05_corrosive": ("H290", "H314", "H318"),
+    "ghs06_toxic": ("H300", "H301", "H310", "H311", "H330", "H331"),
+    "ghs07_harmful": ("H302", "H312", "H315", "H317", "H319", "H332", "H335", "H336"),
+    "ghs08_harmful_health": ("H304", "H334", "H340", "H341", "H350", "H351", "H360",
+                             "H361", "H362", "H370", "H371", "H372", "H373"),
+    "ghs09_environmental": ("H400", "H410", "H411"),
+}
+
+_TRUE_FLAGS = {"y", "yes", "x", "true", "1", "✓", "✔"}
+_FALSE_FLAGS = {"n", "no", "false", "0", "-", "n/a", "na", "none"}
+
+_LABEL_RE = re.compile(r"\((?:review required|estimated)\)", re.IGNORECASE)
+_VALUE_RE = re.compile(
+    r"^(?P<number>[-+]?(?:\d+(?:\.\d+)?|\.\d+)(?:e[-+]?\d+)?)"
+    r"\s*°?\s*(?P<unit>[a-zµ·]+)?"
+    r"(?P<note>\s*\([^()]*\))?"
+    r"(?P<condition>\s*(?:@|at\s).*)?$"
+)
+_PA_S_RE = re.compile(r"pa[\s.*·]+s\b")  # "mPa s", "mPa.s" → "mpa·s"
+_ALT_VALUE_NOTE_RE = re.compile(r"^\(\s*[-+−–]?[\d.]+[^()]*\)")
+_H_CODE_RE = re.compile(r"H\d{3}")
+
+
+def _clean(value: str | None) -> str:
+    """Strip transparency labels and normalize minus signs."""
+    if not value:
+        return ""
+    return _LABEL_RE.sub("", value).replace("−", "-").replace("–", "-").strip()
+
+
+def _parse_value(text: str, units: dict) -> tuple[float, str | None, str] | None:
+    """
+    (number, unit, rest) if the whole cell is `<number> [known unit] [(note)] [@ condition]`,
+    else None. The rest (note and condition) keeps its original case, e.g. "(-258.7 °F)".
+    """
+    text = text.replace("\u00a0", " ")
+    lowered = text.lower()
+    if "pa·s" in units:
+        lowered = _PA_S_RE.sub("pa·s", lowered)
+    match = _VALUE_RE.match(lowered)
+    if not match:
+        return None
+    unit = match.group("unit")
+    if unit is not None and unit not in units:
+        return None
+    rest_start = match.end("unit") if unit is not None else match.end("number")
+    # Offsets shift when a unit like "mPa s" was rewritten, so cut from the end instead
+    rest = text[len(text) - (len(lowered) - rest_start):].strip() if rest_start < len(lowered) else ""
+    return float(match.group("number")), unit, rest
+
+
+def parse_numeric_column(values: list[str | None], field: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Parse one column into an (n, 3) array of [value, multiplier, offset] plus a mask of
+    cells that carried an explicit unit. Empty, ambiguous or unparseable cells have NaN value.
+    """
+    units = FIELD_UNITS.get(field, {})
+    n = len(values)
+    parsed = np.full((n, 3), np.nan)
+    parsed[:, 1] = 1.0
+    parsed[:, 2] = 0.0
+    explicit = np.zeros(n, dtype=bool)
+
+    for i, raw in enumerate(values):
+        value = _parse_value(_clean(raw), units)
+        if value is None:
+            continue
+        parsed[i, 0], unit, _ = value
+        if unit:
+            parsed[i, 1], parsed[i, 2] = units[unit]
+            explicit[i] = True
+
+    return parsed, explicit
+
+
+def build_numeric_matrix(records: list[HMISGasRecord]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Parse NUMERIC_FIELDS across all records into a (rows, fields) float matrix in schema units.
+
+    Returns:
+        (matrix, converted) where `converted` marks cells whose source unit differed
+        from the schema unit and were rescaled.
+    """
+    n = len(records)
+    matrix = np.full((n, len(NUMERIC_FIELDS)), np.nan)
+    converted = np.zeros((n, len(NUMERIC_FIELDS)), dtype=bool)
+
+    for j, field in enumerate(NUMERIC_FIELDS):
+        column = [getattr(r, field) for r in records]
+        parsed, explicit = parse_numeric_column(column, field)
+        # Bulk unit normalization
+        matrix[:, j] = parsed[:, 0] * parsed[:, 1] + parsed[:, 2]
+        converted[:, j] = explicit & ((parsed[:, 1] != 1.0) | (parsed[:, 2] != 0.0))
+
+    return matrix, converted
+
+
+def _parse_flags(values: list[str | None]) -> np.ndarray:
+    """Parse Y/N style flag cells into 1.0 / 0.0, NaN when blank or unrecognised."""
+    out = np.full(len(values), np.nan)
+    for i, raw in enumerate(values):
+        text = _clean(raw).lower()
+        if text in _TRUE_FLAGS:
+            out[i] = 1.0
+        elif text in _FALSE_FLAGS:
+            out[i] = 0.0
+    return out
+
+
+def _hazard_code_matrix(records: list[HMISGasRecord]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return (implied, has_statement): implied[i, j] is True when row i's H-statement
+    contains a code for GHS column j.
+    """
+    ghs_fields = list(GHS_HAZARD_CODES)
+    implied = np.zeros((len(records), len(ghs_fields)), dtype=bool)
+    has_statement = np.zeros(len(records), dtype=bool)
+
+    for i, record in enumerate(records):
+        codes = set(_H_CODE_RE.findall((record.hazardous_statement or "").upper()))
+        if not codes:
+            continue
+        has_statement[i] = True
+        for j, field in enumerate(ghs_fields):
+            implied[i, j] = bool(codes.intersection(GHS_HAZARD_CODES[field]))
+
+    return implied, has_statement
+
+
+def validate_records(
+    records: list[HMISGasRecord],
+    filled_cells: dict[int, set[str]] | None = None,
+) -> dict[int, dict[str, str]]:
+    """
+    Run bulk plausibility and cross-field checks over the whole table. Cells that do not
+    parse are not reported here; see `label_unparsed`.
+
+    Args:
+        records: All rows; original values take part in cross-field checks
+        filled_cells: Row index → fields the agent filled. If given, only those cells
+            are reported, so source spreadsheet values are never sent for re-fill.
+
+    Returns:
+        Mapping of record index → {field: reason} for every flagged cell.
+        Rows without issues are omitted.
+    """
+    issues: dict[int, dict[str, str]] = {}
+
+    def flag(mask: np.ndarray, field: str, reason: str) -> None:
+        for i in np.flatnonzero(mask):
+            if filled_cells is not None and field not in filled_cells.get(int(i), ()):
+                continue
+            issues.setdefault(int(i), {}).setdefault(field, reason)
+
+    if not records:
+        return issues
+
+    matrix, _ = build_numeric_matrix(records)
+    col = {field: matrix[:, j] for j, field in enumerate(NUMERIC_FIELDS)}
+
+    # Physical plausibility ranges (NaN compares False, so blanks pass)
+    for field, (low, high) in PLAUSIBLE_RANGES.items():
+        values = col[field]
+        flag((values < low) | (values > high), field, f"outside plausible range [{low}, {high}]")
+
+    # Cross-field: melting point must lie below boiling point
+    melt, boil = col["freeze_melt_point_c"], col["boiling_point_c"]
+    inverted = melt >= boil
+    flag(inverted, "freeze_melt_point_c", "melting point not below boiling point")
+    flag(inverted, "boiling_point_c", "boiling point not above melting point")
+
+    # Cross-field: a gas stored as compressed/liquefied gas must boil below ~ambient
+    form = np.array([_clean(r.physical_form).upper() for r in records])
+    is_gas = np.isin(form, ["CG", "LG"])
+    flag(is_gas & (boil > 100.0), "boiling_point_c", "boiling point too high for a compressed/liquefied gas")
+
+    # Cross-field: GHS pictogram flags must agree with H-statement codes
+    implied, has_statement = _hazard_code_matrix(records)
+    for j, field in enumerate(GHS_HAZARD_CODES):
+        flags = _parse_flags([getattr(r, field) for r in records])
+        missing = has_statement & implied[:, j] & (flags == 0.0)
+        spurious = has_statement & ~implied[:, j] & (flags == 1.0)
+        flag(missing, field, "H-statement implies this pictogram")
+        flag(spurious, field, "no supporting H-statement code")
+
+    total = sum(len(v) for v in issues.values())
+    logger.info(f"🔎 Validation: {total} flagged cells across {len(issues)} rows")
+    return issues
+
+
+def normalize_units(records: list[HMISGasRecord]) -> list[HMISGasRecord]:
+    """Rewrite numeric cells given in non-schema units (°F, K, kPa, psi, ...) into schema units."""
+    if not records:
+        return records
+
+    matrix, converted = build_numeric_matrix(records)
+    if not converted.any():
+        return records
+
+    normalized: list[HMISGasRecord] = []
+    for i, record in enumerate(records):
+        if not converted[i].any():
+            normalized.append(record)
+            continue
+        data = record.model_dump()
+        for j in np.flatnonzero(converted[i]):
+            field = NUMERIC_FIELDS[j]
+            # Keep notes and the measurement condition ("@ 20 °C") and the review label;
+            # an alternate-unit note ("(-258.7 °F)") would only restate the old value
+            _, _, rest = _parse_value(_clean(data[field]), FIELD_UNITS[field])
+            rest = _ALT_VALUE_NOTE_RE.sub("", rest).strip()
+            rest = f" {rest}" if rest else ""
+            suffix = " (review required)" if "review required" in (data[field] or "") else ""
+            data[field] = f"{matrix[i, j]:.4g}{rest}{suffix}"
+        normalized.append(HMISGasRecord(**data))
+
+    logger.info(f"✓ Normalized {int(converted.sum())} cells to schema units")
+    return normalized
+
+
+def label_unparsed(
+    records: list[HMISGasRecord],
+    filled_cells: dict[int, set[str]] | None = None,
+) -> list[HMISGasRecord]:
+    """
+    Label numeric cells that are present but not a single number with unit
+    "(review required)". They are kept rather than blanked for a re-fill, which could
+    replace a sourced value with an estimate. With `filled_cells`, only cells the agent
+    filled are labeled.
+    """
+    labeled: list[HMISGasRecord] = []
+    count = 0
+    for i, record in enumerate(records):
+        updates = {}
+        for field in NUMERIC_FIELDS:
+            if filled_cells is not None and field not in filled_cells.get(i, ()):
+                continue
+            raw = getattr(record, field)
+            if not _clean(raw) or _LABEL_RE.search(raw):
+                continue
+            if _parse_value(_clean(raw), FIELD_UNITS[field]) is None:
+                updates[field] = f"{raw.strip()} (review required)"
+        if updates:
+            count += len(updates)
+            record = record.model_copy(update=updates)
+        labeled.append(record)
+
+    if count:
+        logger.info(f"🏷️  {count} unparseable numeric cells labeled for review")
+    return labeled
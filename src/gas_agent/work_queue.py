@@ -0,0 +1,316 @@
+"""
+SQLite-backed work queue so several machines/containers can fill one table together.
+
+    init_queue("queue.db", "docs/HMIS TABLE.xlsx")       # once
+    run_worker("queue.db")                                 # on every worker
+    merge_queue_to_excel("queue.db", "docs/HMIS_filled.xlsx")
+
+Workers lease one row at a time. A lease carries a random token and an expiry that a
+background heartbeat keeps extending while `fill_record_with_graph` runs. Leases of
+crashed workers expire and are handed out again; a result is only committed if the
+worker still holds the lease token, so each row is committed exactly once.
+
+The database file must live on storage with working file locks (a local disk shared
+by containers, or a network filesystem that supports POSIX locks).
+"""
+
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from gas_agent.schema import HMISGasRecord
+from gas_agent.loader import load_hmis_excel
+from gas_agent.export import export_records_to_excel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_S = 300.0
+DEFAULT_HEARTBEAT_S = 60.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rows (
+    idx INTEGER PRIMARY KEY,
+    record TEXT NOT NULL,
+    result TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',  -- pending | leased | done | failed
+    worker TEXT,
+    lease_token TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS rows_status ON rows (status, lease_expires);
+"""
+
+
+class WorkQueue:
+    """Row queue with expiring leases in a single SQLite file."""
+
+    def __init__(self, db_path: str | Path, *, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.db_path = Path(db_path)
+        self.max_attempts = max_attempts
+        self._conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()  # one connection shared with the heartbeat thread
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _write(self, sql: str, params: tuple = ()) -> int:
+        """Run one statement in an immediate (write-locked) transaction; returns rowcount."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cur = self._conn.execute(sql, params)
+                self._conn.execute("COMMIT")
+                return cur.rowcount
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    # ------------------------------------------------------------------
+    # Setup
+    # ------------------------------------------------------------------
+
+    def add_records(self, records: list[HMISGasRecord], *, source: str | Path | None = None) -> int:
+        """Enqueue records by position; rows already in the queue are left untouched."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                before = self._conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO rows (idx, record, updated_at) VALUES (?, ?, ?)",
+                    [(i, r.model_dump_json(), time.time()) for i, r in enumerate(records)],
+                )
+                if source is not None:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO meta (key, value) VALUES ('source', ?)", (str(Path(source).resolve()),)
+                    )
+                after = self._conn.execute("SELECT COUNT(*) FROM rows").fetchone()[0]
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return after - before
+
+    def source(self) -> Path | None:
+        """Original Excel file the queue was initialised from."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+        return Path(row[0]) if row else None
+
+    # ------------------------------------------------------------------
+    # Leases
+    # ------------------------------------------------------------------
+
+    def lease(self, worker: str, lease_s: float = DEFAULT_LEASE_S) -> tuple[int, str, HMISGasRecord] | None:
+        """
+        Atomically lease the next pending row, or a row whose lease has expired.
+        Returns (idx, lease_token, record) or None if nothing is leasable right now.
+        """
+        token = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                # Rows that outlived too many leases (e.g. crash a worker every time) stop here
+                self._conn.execute(
+                    """UPDATE rows SET status = 'failed', lease_token = NULL,
+                       error = 'lease expired after max attempts', updated_at = ?
+                       WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?""",
+                    (now, now, self.max_attempts),
+                )
+                row = self._conn.execute(
+                    """SELECT idx, record, status, worker FROM rows
+                       WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)
+                       ORDER BY idx LIMIT 1""",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                idx, record_json, status, previous = row
+                self._conn.execute(
+                    """UPDATE rows SET status = 'leased', worker = ?, lease_token = ?,
+                       lease_expires = ?, attempts = attempts + 1, updated_at = ? WHERE idx = ?""",
+                    (worker, token, now + lease_s, now, idx),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if status == "leased":
+            logger.warning(f"♻️  Reclaimed row {idx} from expired lease of {previous}")
+        return idx, token, HMISGasRecord.model_validate_json(record_json)
+
+    def heartbeat(self, idx: int, token: str, lease_s: float = DEFAULT_LEASE_S) -> bool:
+        """Extend a lease; False if it was lost (expired and re-leased)."""
+        now = time.time()
+        return self._write(
+            """UPDATE rows SET lease_expires = ?, updated_at = ?
+               WHERE idx = ? AND lease_token = ? AND status = 'leased'""",
+            (now + lease_s, now, idx, token),
+        ) == 1
+
+    def complete(self, idx: int, token: str, record: HMISGasRecord) -> bool:
+        """Commit a result if the lease is still held; False means another worker owns the row."""
+        return self._write(
+            """UPDATE rows SET status = 'done', result = ?, lease_token = NULL,
+               lease_expires = NULL, error = NULL, updated_at = ?
+               WHERE idx = ? AND lease_token = ? AND status = 'leased'""",
+            (record.model_dump_json(), time.time(), idx, token),
+        ) == 1
+
+    def fail(self, idx: int, token: str, error: str) -> None:
+        """Release a lease after an error; the row is retried until max_attempts."""
+        self._write(
+            """UPDATE rows SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+               lease_token = NULL, lease_expires = NULL, error = ?, updated_at = ?
+               WHERE idx = ? AND lease_token = ? AND status = 'leased'""",
+            (self.max_attempts, error[:2000], time.time(), idx, token),
+        )
+
+    # ------------------------------------------------------------------
+    # Progress / results
+    # ------------------------------------------------------------------
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM rows GROUP BY status").fetchall()
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        counts.update(dict(rows))
+        return counts
+
+    def next_expiry(self) -> float | None:
+        """Earliest expiry among active leases (when a crashed worker's row frees up)."""
+        with self._lock:
+            row = self._conn.execute("SELECT MIN(lease_expires) FROM rows WHERE status = 'leased'").fetchone()
+        return row[0]
+
+    def records(self) -> list[HMISGasRecord]:
+        """All rows in order: filled result where done, original record otherwise."""
+        with self._lock:
+            rows = self._conn.execute("SELECT record, result FROM rows ORDER BY idx").fetchall()
+        return [HMISGasRecord.model_validate_json(result or record) for record, result in rows]
+
+
+def _default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def init_queue(
+    db_path: str | Path,
+    input_path: str | Path,
+    *,
+    sheet_name: str | None = None,
+    max_rows: int | None = None,
+) -> WorkQueue:
+    """Create (or extend) a queue from `load_hmis_excel` output. Safe to call repeatedly."""
+    records = load_hmis_excel(input_path, sheet_name=sheet_name)
+    if max_rows is not None:
+        records = records[:max_rows]
+    queue = WorkQueue(db_path)
+    added = queue.add_records(records, source=input_path)
+    logger.info(f"📋 Queue {db_path}: {added} rows added, {queue.stats()}")
+    return queue
+
+
+def run_worker(
+    db_path: str | Path,
+    *,
+    worker_id: str | None = None,
+    lease_s: float = DEFAULT_LEASE_S,
+    heartbeat_s: float = DEFAULT_HEARTBEAT_S,
+    poll_s: float = 5.0,
+    **fill_kwargs,
+) -> int:
+    """
+    Lease and fill rows until the queue is drained. Extra kwargs go to
+    `fill_record_with_graph`. Returns the number of rows this worker committed.
+
+    While other workers hold leases the loop keeps polling, so rows of workers that
+    crash are picked up once their lease expires.
+    """
+    from gas_agent.graph_agent import fill_record_with_graph
+
+    worker_id = worker_id or _default_worker_id()
+    queue = WorkQueue(db_path)
+    committed = 0
+
+    try:
+        while True:
+            leased = queue.lease(worker_id, lease_s)
+            if leased is None:
+                stats = queue.stats()
+                if stats["pending"] == 0 and stats["leased"] == 0:
+                    break
+                expiry = queue.next_expiry()
+                wait = poll_s if expiry is None else min(poll_s, max(0.1, expiry - time.time()))
+                time.sleep(wait)
+                continue
+
+            idx, token, record = leased
+            print(f"[{worker_id}] Processing row {idx + 1}: {record.chemical_name or record.sub_system_filter_formula}")
+
+            stop = threading.Event()
+
+            def beat() -> None:
+                while not stop.wait(heartbeat_s):
+                    if not queue.heartbeat(idx, token, lease_s):
+                        logger.warning(f"✗ Row {idx}: lease lost to another worker")
+                        return
+
+            heart = threading.Thread(target=beat, daemon=True)
+            heart.start()
+            try:
+                filled = fill_record_with_graph(record, **fill_kwargs)
+                if queue.complete(idx, token, filled):
+                    committed += 1
+                else:
+                    logger.warning(f"✗ Row {idx}: lease lost, result discarded")
+            except Exception as e:
+                logger.warning(f"✗ Row {idx} failed: {e}")
+                queue.fail(idx, token, repr(e))
+            finally:
+                stop.set()
+                heart.join()
+    finally:
+        queue.close()
+
+    logger.info(f"✓ Worker {worker_id} done: {committed} rows committed")
+    return committed
+
+
+def merge_queue_to_excel(
+    db_path: str | Path,
+    output_path: str | Path,
+    *,
+    original_path: str | Path | None = None,
+) -> list[HMISGasRecord]:
+    """Build the final workbook from the queue through the exporter."""
+    queue = WorkQueue(db_path)
+    try:
+        stats = queue.stats()
+        if stats["pending"] or stats["leased"]:
+            logger.warning(f"⚠️  Merging incomplete queue: {stats}")
+        records = queue.records()
+        original_path = original_path or queue.source()
+    finally:
+        queue.close()
+
+    if original_path is None:
+        raise ValueError("original_path is required: queue has no recorded source file")
+    export_records_to_excel(records, output_path, original_path=original_path)
+    return records